@@ -13,11 +13,14 @@ from auth.auth_middleware import (
     AuthMiddleware,
     AuthMiddlewareError,
     get_auth_middleware,
+    set_session_store,
     validate_jwt,
+    validate_jwt_async,
     extract_bearer_token,
     extract_user_id,
     check_token_expiry,
     fetch_jwks,
+    fetch_jwks_async,
     encrypt_token,
     decrypt_token
 )
@@ -29,22 +32,27 @@ from auth.session_store import (
     IDLE_TIMEOUT_MINUTES,
     MAX_CONVERSATION_MESSAGES
 )
+from auth.sqlite_session_store import SqliteSessionStore
 
 __all__ = [
     # Middleware
     "AuthMiddleware",
     "AuthMiddlewareError",
     "get_auth_middleware",
+    "set_session_store",
     "validate_jwt",
+    "validate_jwt_async",
     "extract_bearer_token",
     "extract_user_id",
     "check_token_expiry",
     "fetch_jwks",
+    "fetch_jwks_async",
     "encrypt_token",
     "decrypt_token",
     
     # Session Store
     "SessionStore",
+    "SqliteSessionStore",
     "get_session_store",
     "SESSION_TIMEOUT_MINUTES",
     "IDLE_TIMEOUT_MINUTES",
@@ -18,15 +18,25 @@ Based on the workflow:
 """
 
 import os
+import sys
 import time
+import asyncio
+import logging
+import threading
+import httpx
 import requests
-from typing import Optional, Tuple
+from collections import OrderedDict
+from requests.adapters import HTTPAdapter
+from typing import Dict, Optional, Tuple
 from jose import jwt, JWTError
-from functools import lru_cache
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 from cryptography.fernet import Fernet
 import hashlib
 import base64
+import binascii
+import json
+
+logger = logging.getLogger(__name__)
 
 # Okta configuration from environment
 OKTA_DOMAIN = os.getenv("OKTA_DOMAIN")
@@ -34,9 +44,23 @@ CLIENT_ID = os.getenv("CLIENT_ID")
 ISSUER = os.getenv("ISSUER")
 
 # JWKS cache settings
-_jwks_cache = None
-_jwks_cache_time = None
 JWKS_CACHE_DURATION = 3600  # 1 hour in seconds
+_jwks_cache: Dict[str, Tuple[float, dict]] = {}  # jwks_url -> (fetched_at, {"raw", "by_kid"})
+_jwks_lock = threading.Lock()
+
+# Validated claims cache: sha256(token) -> (claims, exp)
+CLAIMS_CACHE_SIZE = 1024
+CLAIMS_CACHE_MIN_TTL = 30  # Don't serve cached claims this close to expiry (seconds)
+_claims_cache: "OrderedDict[bytes, Tuple[dict, float]]" = OrderedDict()
+_claims_lock = threading.Lock()
+
+# Pooled HTTP session so JWKS refreshes reuse the keep-alive connection
+_http = requests.Session()
+_http.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=8))
+
+# Async HTTP client for fetch_jwks_async (created lazily, per event loop)
+_http_async: Optional[httpx.AsyncClient] = None
+_http_async_loop = None
 
 
 class AuthMiddlewareError(Exception):
@@ -47,16 +71,20 @@ class AuthMiddlewareError(Exception):
         super().__init__(self.message)
 
 
+# Token encryption key, derived once at import.
+# Uses a secret from environment or falls back to the Okta domain.
+_ENCRYPTION_SECRET = os.getenv("TOKEN_ENCRYPTION_SECRET") or OKTA_DOMAIN or "default_secret"
+# Create a 32-byte key for Fernet
+_FERNET_KEY = base64.urlsafe_b64encode(hashlib.sha256(_ENCRYPTION_SECRET.encode()).digest())
+_FERNET = Fernet(_FERNET_KEY)
+
+
 def _get_encryption_key() -> bytes:
     """
-    Get or generate encryption key for token storage.
+    Get the encryption key for token storage.
     Uses a deterministic key based on environment for consistency.
     """
-    # Use a secret from environment or generate from domain
-    secret = os.getenv("TOKEN_ENCRYPTION_SECRET", OKTA_DOMAIN or "default_secret")
-    # Create a 32-byte key for Fernet
-    key = hashlib.sha256(secret.encode()).digest()
-    return base64.urlsafe_b64encode(key)
+    return _FERNET_KEY
 
 
 def encrypt_token(token: str) -> str:
@@ -70,10 +98,9 @@ def encrypt_token(token: str) -> str:
         The encrypted token as a base64 string.
     """
     try:
-        f = Fernet(_get_encryption_key())
-        return f.encrypt(token.encode()).decode()
+        return _FERNET.encrypt(token.encode()).decode()
     except Exception as e:
-        print(f"[AUTH_MIDDLEWARE] Encryption error: {e}")
+        logger.warning("[AUTH_MIDDLEWARE] Encryption error: %s", e)
         return token  # Fallback to plaintext if encryption fails
 
 
@@ -88,19 +115,132 @@ def decrypt_token(encrypted_token: str) -> str:
         The decrypted plaintext token.
     """
     try:
-        f = Fernet(_get_encryption_key())
-        return f.decrypt(encrypted_token.encode()).decode()
+        return _FERNET.decrypt(encrypted_token.encode()).decode()
     except Exception as e:
         # If decryption fails, assume it's already plaintext
         return encrypted_token
 
 
-def fetch_jwks(force_refresh: bool = False) -> dict:
+def _jwks_url(issuer: str = None) -> str:
+    """Build the JWKS URL for an issuer (defaults to the configured ISSUER)."""
+    issuer = issuer or ISSUER
+    if not issuer:
+        raise AuthMiddlewareError("ISSUER not configured", 500)
+    return f"{issuer}/oauth2/v1/keys"
+
+
+def _get_cached_jwks(jwks_url: str) -> Optional[dict]:
+    """Get the cached JWKS entry for a URL, or None if missing or stale."""
+    with _jwks_lock:
+        entry = _jwks_cache.get(jwks_url)
+    if entry and time.time() - entry[0] < JWKS_CACHE_DURATION:
+        return entry[1]
+    return None
+
+
+def _store_jwks(jwks_url: str, jwks: dict) -> dict:
+    """
+    Cache a freshly fetched JWKS together with its kid -> key index.
+    
+    Returns:
+        dict with "raw" (the JWKS) and "by_kid" (kid -> JWK).
+    """
+    indexed = {
+        "raw": jwks,
+        "by_kid": {k["kid"]: k for k in jwks.get("keys", []) if k.get("kid")}
+    }
+    with _jwks_lock:
+        _jwks_cache[jwks_url] = (time.time(), indexed)
+    logger.info("[AUTH_MIDDLEWARE] JWKS fetched from %s", jwks_url)
+    return indexed
+
+
+def _load_jwks(force_refresh: bool = False, issuer: str = None) -> dict:
+    """
+    Load the cached JWKS entry for an issuer, fetching it when stale.
+    
+    The entry holds the raw JWKS plus a kid -> key index built once per fetch,
+    so signing-key lookups are a single dict access.
+    
+    Returns:
+        dict with "raw" (the JWKS) and "by_kid" (kid -> JWK).
+    """
+    jwks_url = _jwks_url(issuer)
+    
+    # Check if cache is valid
+    if not force_refresh:
+        entry = _get_cached_jwks(jwks_url)
+        if entry is not None:
+            return entry
+    
+    # Fetch fresh JWKS
+    try:
+        response = _http.get(jwks_url, timeout=10)
+        response.raise_for_status()
+        jwks = response.json()
+    except requests.RequestException as e:
+        raise AuthMiddlewareError(f"Failed to fetch JWKS: {str(e)}", 500)
+    
+    return _store_jwks(jwks_url, jwks)
+
+
+async def _get_http_async() -> httpx.AsyncClient:
+    """Get the async HTTP client for the running event loop."""
+    global _http_async, _http_async_loop
+    
+    loop = asyncio.get_running_loop()
+    if _http_async is None or _http_async_loop is not loop:
+        # A client from an earlier loop is closed rather than left to leak its pool
+        await close_http_async()
+        _http_async = httpx.AsyncClient(timeout=10)
+        _http_async_loop = loop
+    
+    return _http_async
+
+
+async def close_http_async():
+    """Close the async HTTP client, if any. Call on server shutdown."""
+    global _http_async, _http_async_loop
+    
+    client, _http_async, _http_async_loop = _http_async, None, None
+    if client is not None:
+        try:
+            await client.aclose()
+        except Exception as e:
+            logger.debug("[AUTH_MIDDLEWARE] Error closing async HTTP client: %s", e)
+
+
+async def _load_jwks_async(force_refresh: bool = False, issuer: str = None) -> dict:
+    """Async variant of _load_jwks that doesn't block the event loop on a fetch."""
+    jwks_url = _jwks_url(issuer)
+    
+    # Check if cache is valid
+    if not force_refresh:
+        entry = _get_cached_jwks(jwks_url)
+        if entry is not None:
+            return entry
+    
+    # Fetch fresh JWKS
+    try:
+        client = await _get_http_async()
+        response = await client.get(jwks_url)
+        response.raise_for_status()
+        jwks = response.json()
+    except httpx.HTTPError as e:
+        raise AuthMiddlewareError(f"Failed to fetch JWKS: {str(e)}", 500)
+    
+    return _store_jwks(jwks_url, jwks)
+
+
+def fetch_jwks(force_refresh: bool = False, issuer: str = None) -> dict:
     """
     Fetch JWKS (JSON Web Key Set) from Okta with caching.
     
+    The cache is keyed by JWKS URL, so several issuers can be cached side by side.
+    
     Args:
         force_refresh: Force refresh the cache.
+        issuer: The token issuer. Defaults to the configured ISSUER.
         
     Returns:
         The JWKS as a dictionary.
@@ -108,30 +248,51 @@ def fetch_jwks(force_refresh: bool = False) -> dict:
     Raises:
         AuthMiddlewareError: If JWKS fetch fails.
     """
-    global _jwks_cache, _jwks_cache_time
+    return _load_jwks(force_refresh, issuer)["raw"]
+
+
+async def fetch_jwks_async(force_refresh: bool = False, issuer: str = None) -> dict:
+    """
+    Fetch JWKS from Okta with caching, without blocking the event loop.
     
-    current_time = time.time()
+    Shares the cache with fetch_jwks().
     
-    # Check if cache is valid
-    if not force_refresh and _jwks_cache and _jwks_cache_time:
-        if current_time - _jwks_cache_time < JWKS_CACHE_DURATION:
-            return _jwks_cache
+    Args:
+        force_refresh: Force refresh the cache.
+        issuer: The token issuer. Defaults to the configured ISSUER.
+        
+    Returns:
+        The JWKS as a dictionary.
+        
+    Raises:
+        AuthMiddlewareError: If JWKS fetch fails.
+    """
+    return (await _load_jwks_async(force_refresh, issuer))["raw"]
+
+
+def _get_token_kid(token: str) -> Optional[str]:
+    """
+    Read the 'kid' from a JWT header without going through jose.
     
-    # Fetch fresh JWKS
-    if not ISSUER:
-        raise AuthMiddlewareError("ISSUER not configured", 500)
+    Args:
+        token: The JWT token.
+        
+    Returns:
+        The key ID, or None if the header has no 'kid'.
+        
+    Raises:
+        AuthMiddlewareError: If the header segment cannot be decoded.
+    """
+    segment = token.split(".", 1)[0]
+    try:
+        header = json.loads(base64.urlsafe_b64decode(segment + "=" * (-len(segment) % 4)))
+    except (ValueError, binascii.Error) as e:
+        raise AuthMiddlewareError(f"Invalid token header: {str(e)}")
     
-    jwks_url = f"{ISSUER}/oauth2/v1/keys"
+    if not isinstance(header, dict):
+        raise AuthMiddlewareError("Invalid token header")
     
-    try:
-        response = requests.get(jwks_url, timeout=10)
-        response.raise_for_status()
-        _jwks_cache = response.json()
-        _jwks_cache_time = current_time
-        print(f"[AUTH_MIDDLEWARE] JWKS fetched from {jwks_url}")
-        return _jwks_cache
-    except requests.RequestException as e:
-        raise AuthMiddlewareError(f"Failed to fetch JWKS: {str(e)}", 500)
+    return header.get("kid")
 
 
 def _find_signing_key(token: str) -> dict:
@@ -147,56 +308,70 @@ def _find_signing_key(token: str) -> dict:
     Raises:
         AuthMiddlewareError: If no matching key is found.
     """
-    try:
-        header = jwt.get_unverified_header(token)
-        kid = header.get("kid")
-        
-        if not kid:
-            raise AuthMiddlewareError("No 'kid' in token header")
-        
-        jwks = fetch_jwks()
-        
-        for key in jwks.get("keys", []):
-            if key.get("kid") == kid:
-                return key
-        
+    kid = _get_token_kid(token)
+    
+    if not kid:
+        raise AuthMiddlewareError("No 'kid' in token header")
+    
+    key = _load_jwks()["by_kid"].get(kid)
+    if key is None:
         # Key not found, try refreshing JWKS
-        jwks = fetch_jwks(force_refresh=True)
-        
-        for key in jwks.get("keys", []):
-            if key.get("kid") == kid:
-                return key
-        
+        key = _load_jwks(force_refresh=True)["by_kid"].get(kid)
+    
+    if key is None:
         raise AuthMiddlewareError(f"No matching key found for kid: {kid}")
-        
-    except JWTError as e:
-        raise AuthMiddlewareError(f"Invalid token header: {str(e)}")
+    
+    return key
 
 
-def validate_jwt(token: str) -> dict:
-    """
-    Validate a JWT token using Okta JWKS.
+async def _find_signing_key_async(token: str) -> dict:
+    """Async variant of _find_signing_key."""
+    kid = _get_token_kid(token)
     
-    This function performs full JWT validation:
-    1. Verifies signature using Okta's public keys
-    2. Validates standard claims (iss, aud, exp)
-    3. Returns decoded claims if valid
+    if not kid:
+        raise AuthMiddlewareError("No 'kid' in token header")
+    
+    key = (await _load_jwks_async())["by_kid"].get(kid)
+    if key is None:
+        # Key not found, try refreshing JWKS
+        key = (await _load_jwks_async(force_refresh=True))["by_kid"].get(kid)
+    
+    if key is None:
+        raise AuthMiddlewareError(f"No matching key found for kid: {kid}")
+    
+    return key
+
+
+def _token_hash(token: str) -> bytes:
+    """Get the claims-cache key for a token."""
+    return hashlib.sha256(token.encode()).digest()
+
+
+def _get_cached_claims(token_hash: bytes) -> Optional[dict]:
+    """
+    Get a copy of previously validated claims for a token.
     
     Args:
-        token: The JWT token (without 'Bearer ' prefix).
+        token_hash: The token's cache key (see _token_hash).
         
     Returns:
-        The decoded JWT claims.
-        
+        The claims, or None if not cached or too close to expiry.
+    """
+    with _claims_lock:
+        entry = _claims_cache.get(token_hash)
+        if entry and entry[1] - time.time() > CLAIMS_CACHE_MIN_TTL:
+            _claims_cache.move_to_end(token_hash)
+            return dict(entry[0])
+    return None
+
+
+def _decode_jwt(token: str, key: dict, token_hash: bytes) -> dict:
+    """
+    Verify a JWT against its signing key and cache the resulting claims.
+    
     Raises:
         AuthMiddlewareError: If validation fails.
     """
-    if not token:
-        raise AuthMiddlewareError("No token provided")
-    
-    # Find the signing key
-    key = _find_signing_key(token)
-    
     try:
         # Decode and validate token
         claims = jwt.decode(
@@ -212,14 +387,88 @@ def validate_jwt(token: str) -> dict:
                 "verify_exp": True
             }
         )
-        return claims
-        
     except jwt.ExpiredSignatureError:
         raise AuthMiddlewareError("Token has expired")
     except jwt.JWTClaimsError as e:
         raise AuthMiddlewareError(f"Invalid token claims: {str(e)}")
     except JWTError as e:
         raise AuthMiddlewareError(f"Token validation failed: {str(e)}")
+    
+    exp = claims.get("exp")
+    if exp:
+        with _claims_lock:
+            _claims_cache[token_hash] = (claims, exp)
+            _claims_cache.move_to_end(token_hash)
+            if len(_claims_cache) > CLAIMS_CACHE_SIZE:
+                _claims_cache.popitem(last=False)
+    
+    return dict(claims)
+
+
+def validate_jwt(token: str) -> dict:
+    """
+    Validate a JWT token using Okta JWKS.
+    
+    This function performs full JWT validation:
+    1. Verifies signature using Okta's public keys
+    2. Validates standard claims (iss, aud, exp)
+    3. Returns decoded claims if valid
+    
+    Args:
+        token: The JWT token (without 'Bearer ' prefix).
+        
+    Returns:
+        The decoded JWT claims.
+        
+    Raises:
+        AuthMiddlewareError: If validation fails.
+    """
+    if not token:
+        raise AuthMiddlewareError("No token provided")
+    
+    # Serve repeat tokens from the claims cache (skips the RSA verify)
+    token_hash = _token_hash(token)
+    cached = _get_cached_claims(token_hash)
+    if cached is not None:
+        return cached
+    
+    # Find the signing key
+    key = _find_signing_key(token)
+    
+    return _decode_jwt(token, key, token_hash)
+
+
+async def validate_jwt_async(token: str) -> dict:
+    """
+    Validate a JWT token without blocking the event loop.
+    
+    Same checks as validate_jwt(); the JWKS fetch is awaited and the
+    CPU-bound signature verification runs in a worker thread.
+    
+    Args:
+        token: The JWT token (without 'Bearer ' prefix).
+        
+    Returns:
+        The decoded JWT claims.
+        
+    Raises:
+        AuthMiddlewareError: If validation fails.
+    """
+    if not token:
+        raise AuthMiddlewareError("No token provided")
+    
+    # Cached tokens return without a thread hop
+    token_hash = _token_hash(token)
+    cached = _get_cached_claims(token_hash)
+    if cached is not None:
+        return cached
+    
+    key = await _find_signing_key_async(token)
+    
+    return await asyncio.to_thread(_decode_jwt, token, key, token_hash)
+
+
+_BEARER_PREFIXES = ("Bearer ", "bearer ", "BEARER ")
 
 
 def extract_bearer_token(authorization_header: str) -> str:
@@ -238,6 +487,12 @@ def extract_bearer_token(authorization_header: str) -> str:
     if not authorization_header:
         raise AuthMiddlewareError("Authorization header missing")
     
+    # Fast path for the usual "Bearer <token>" form; any inner whitespace takes the split path
+    if authorization_header[:7] in _BEARER_PREFIXES:
+        token = authorization_header[7:].strip()
+        if token and not any(c.isspace() for c in token):
+            return token
+    
     parts = authorization_header.split()
     
     if len(parts) != 2:
@@ -249,6 +504,28 @@ def extract_bearer_token(authorization_header: str) -> str:
     return parts[1]
 
 
+# datetime.fromisoformat() accepts a trailing "Z" from Python 3.11 on
+_FROMISOFORMAT_ACCEPTS_Z = sys.version_info >= (3, 11)
+
+
+def _parse_utc(value: str) -> datetime:
+    """
+    Parse an ISO timestamp (as written by the session store) into an aware UTC datetime.
+    
+    Args:
+        value: ISO-8601 string, e.g. "2024-01-01T12:00:00.000000Z".
+        
+    Returns:
+        The timezone-aware datetime.
+    """
+    if not _FROMISOFORMAT_ACCEPTS_Z and value.endswith("Z"):
+        value = value[:-1] + "+00:00"
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed
+
+
 def extract_user_id(claims: dict) -> str:
     """
     Extract user ID (sub claim) from JWT claims.
@@ -262,7 +539,10 @@ def extract_user_id(claims: dict) -> str:
     Raises:
         AuthMiddlewareError: If sub claim is missing.
     """
-    user_id = claims.get("sub")
+    try:
+        user_id = claims["sub"]
+    except KeyError:
+        raise AuthMiddlewareError("No 'sub' claim in token")
     
     if not user_id:
         raise AuthMiddlewareError("No 'sub' claim in token")
@@ -281,19 +561,18 @@ def check_token_expiry(claims: dict, buffer_minutes: int = 5) -> Tuple[bool, Opt
     Returns:
         Tuple of (is_expiring_soon, seconds_until_expiry).
     """
-    exp = claims.get("exp")
+    try:
+        exp = claims["exp"]
+    except KeyError:
+        return True, None
     
     if not exp:
         return True, None
     
-    current_time = time.time()
-    seconds_until_expiry = exp - current_time
+    seconds_until_expiry = exp - time.time()
     
     # Check if expiring within buffer time
-    buffer_seconds = buffer_minutes * 60
-    is_expiring_soon = seconds_until_expiry < buffer_seconds
-    
-    return is_expiring_soon, int(seconds_until_expiry)
+    return seconds_until_expiry < buffer_minutes * 60, int(seconds_until_expiry)
 
 
 class AuthMiddleware:
@@ -345,8 +624,8 @@ class AuthMiddleware:
             else:
                 raise AuthMiddlewareError("No token provided")
             
-            # Validate JWT
-            claims = validate_jwt(token)
+            # Validate JWT (async JWKS fetch, RSA verify in a worker thread)
+            claims = await validate_jwt_async(token)
             
             # Extract user info
             user_id = extract_user_id(claims)
@@ -420,17 +699,26 @@ class AuthMiddleware:
                 "error": f"Session is {session.get('status', 'unknown')}"
             }
         
-        # Check if session is expired
+        # Check if session is expired (epoch field when the store provides it)
+        expires_at_ts = session.get("expires_at_ts")
         expires_at = session.get("expires_at")
-        if expires_at:
+        if expires_at_ts is not None:
+            expired = expires_at_ts < time.time()
+        elif expires_at:
             if isinstance(expires_at, str):
-                expires_at = datetime.fromisoformat(expires_at.replace("Z", "+00:00"))
-            if expires_at < datetime.utcnow():
-                await self.session_store.invalidate_session(session_id)
-                return {
-                    "valid": False,
-                    "error": "Session has expired"
-                }
+                expires_at = _parse_utc(expires_at)
+            elif expires_at.tzinfo is None:
+                expires_at = expires_at.replace(tzinfo=timezone.utc)
+            expired = expires_at < datetime.now(timezone.utc)
+        else:
+            expired = False
+        
+        if expired:
+            await self.session_store.invalidate_session(session_id)
+            return {
+                "valid": False,
+                "error": "Session has expired"
+            }
         
         return {
             "valid": True,
@@ -440,6 +728,7 @@ class AuthMiddleware:
 
 # Singleton middleware instance
 _auth_middleware = None
+_mw_lock = threading.Lock()
 
 
 def get_auth_middleware(session_store=None) -> AuthMiddleware:
@@ -447,14 +736,31 @@ def get_auth_middleware(session_store=None) -> AuthMiddleware:
     Get or create the auth middleware singleton.
     
     Args:
-        session_store: Optional SessionStore instance.
+        session_store: Optional SessionStore instance. If the singleton already
+                       exists, its session store is swapped via set_session_store().
         
     Returns:
         The AuthMiddleware instance.
     """
     global _auth_middleware
     
-    if _auth_middleware is None or session_store is not None:
-        _auth_middleware = AuthMiddleware(session_store)
+    if _auth_middleware is None:
+        with _mw_lock:
+            if _auth_middleware is None:
+                _auth_middleware = AuthMiddleware(session_store)
+                return _auth_middleware
+    
+    if session_store is not None:
+        set_session_store(session_store)
     
     return _auth_middleware
+
+
+def set_session_store(session_store) -> None:
+    """
+    Replace the session store used by the auth middleware singleton.
+    
+    Args:
+        session_store: The SessionStore instance to use.
+    """
+    get_auth_middleware().session_store = session_store
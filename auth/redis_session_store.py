@@ -0,0 +1,533 @@
+"""
+Redis-backed Session Store for MCP Server.
+
+Same async interface as SessionStore, but all state lives in Redis so it can
+be shared by several MCP server processes:
+- session:{session_id}      - Session metadata (HASH, one JSON value per field)
+- user:{user_id}:session    - Current session ID for a user
+- conv:{session_id}         - Conversation messages (LIST, trimmed with LTRIM)
+- cache:{session_id}        - User cache/preferences (HASH, one JSON value per field)
+
+Field updates are single HSETs, so workers updating different fields of the
+same session don't overwrite each other. The bearer token is not stored.
+
+All keys expire after SESSION_TIMEOUT_MINUTES, so expired sessions need no sweep.
+
+Selected automatically when REDIS_URL is set (or SESSION_STORE_BACKEND=redis).
+"""
+
+import os
+import json
+import uuid
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Optional, List
+
+import redis.asyncio as redis
+
+from auth.session_store import (
+    SESSION_TIMEOUT_MINUTES,
+    IDLE_TIMEOUT_MINUTES,
+    MAX_CONVERSATION_MESSAGES
+)
+
+logger = logging.getLogger(__name__)
+
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+
+# Number of recent messages mirrored into the cache
+CACHE_LAST_MESSAGES = 10
+
+
+def _to_iso(dt: datetime) -> str:
+    """Format an aware UTC datetime as the stores' "...Z" ISO timestamp."""
+    return dt.strftime("%Y-%m-%dT%H:%M:%S.%f") + "Z"
+
+
+class RedisSessionStore:
+    """
+    Session store backed by Redis.
+
+    Data structures match SessionStore; see its docstring for the session,
+    conversation and cache layouts.
+    """
+
+    def __init__(self, url: str = None):
+        """
+        Initialize the session store.
+
+        Args:
+            url: Redis connection URL. Defaults to REDIS_URL.
+        """
+        self.url = url or REDIS_URL
+        self._redis = redis.from_url(self.url, decode_responses=True)
+        self._ttl = SESSION_TIMEOUT_MINUTES * 60
+
+    @staticmethod
+    def _session_key(session_id: str) -> str:
+        return f"session:{session_id}"
+
+    @staticmethod
+    def _user_key(user_id: str) -> str:
+        return f"user:{user_id}:session"
+
+    @staticmethod
+    def _conversation_key(session_id: str) -> str:
+        return f"conv:{session_id}"
+
+    @staticmethod
+    def _cache_key(session_id: str) -> str:
+        return f"cache:{session_id}"
+
+    @staticmethod
+    def _encode(fields: dict) -> dict:
+        """JSON-encode each field value for storage in a HASH."""
+        return {k: json.dumps(v, default=str) for k, v in fields.items()}
+
+    async def _get_hash(self, key: str) -> Optional[dict]:
+        """Read a HASH as a dict, or None if the key doesn't exist."""
+        data = await self._redis.hgetall(key)
+        return {k: json.loads(v) for k, v in data.items()} if data else None
+
+    async def _set_fields(self, key: str, fields: dict) -> bool:
+        """
+        HSET fields on an existing HASH (the key's TTL is kept).
+
+        WATCH makes the existence check and the write atomic, so an update
+        racing an invalidate or expiry can't recreate the key without a TTL.
+
+        Returns:
+            True if updated, False if the key doesn't exist.
+        """
+        async def update(pipe) -> bool:
+            if not await pipe.exists(key):
+                return False
+            pipe.multi()
+            pipe.hset(key, mapping=self._encode(fields))
+            return True
+
+        return await self._redis.transaction(update, key, value_from_callable=True)
+
+    async def flush(self):
+        """No-op; writes go straight to Redis."""
+
+    async def create_session(
+        self,
+        user_id: str,
+        bearer_token: str = None,
+        email: str = None,
+        name: str = None,
+        metadata: dict = None
+    ) -> dict:
+        """
+        Create a new session for a user.
+
+        If a session already exists for the user, it will be invalidated first.
+
+        Args:
+            user_id: The user's ID (JWT sub claim).
+            bearer_token: The encrypted bearer token.
+            email: The user's email address.
+            name: The user's display name.
+            metadata: Additional metadata to store.
+
+        Returns:
+            The created session data.
+        """
+        # Invalidate any existing session for this user
+        existing_session_id = await self._redis.get(self._user_key(user_id))
+        if existing_session_id:
+            await self.invalidate_session(existing_session_id)
+
+        session_id = str(uuid.uuid4())
+
+        now = datetime.now(timezone.utc)
+        expires_at = now + timedelta(minutes=SESSION_TIMEOUT_MINUTES)
+
+        session = {
+            "session_id": session_id,
+            "user_id": user_id,
+            "email": email,
+            "name": name,
+            "bearer_token": bearer_token,
+            "created_at": _to_iso(now),
+            "last_activity": _to_iso(now),
+            "expires_at": _to_iso(expires_at),
+            "status": "active",
+            "metadata": metadata or {}
+        }
+        cache = {
+            "session_id": session_id,
+            "last_messages": [],
+            "conversation_summary": "",
+            "user_preferences": {},
+            "state": {}
+        }
+
+        async with self._redis.pipeline(transaction=True) as pipe:
+            # The bearer token is never persisted (Redis RDB/AOF would put it on disk)
+            stored = {k: v for k, v in session.items() if k != "bearer_token"}
+            pipe.hset(self._session_key(session_id), mapping=self._encode(stored))
+            pipe.expire(self._session_key(session_id), self._ttl)
+            pipe.set(self._user_key(user_id), session_id, ex=self._ttl)
+            pipe.hset(self._cache_key(session_id), mapping=self._encode(cache))
+            pipe.expire(self._cache_key(session_id), self._ttl)
+            await pipe.execute()
+
+        logger.debug("[SESSION_STORE] Created session %s for user %s", session_id, user_id)
+
+        return session
+
+    async def get_session(self, session_id: str) -> Optional[dict]:
+        """
+        Get a session by its ID.
+
+        Args:
+            session_id: The session ID.
+
+        Returns:
+            The session data or None if not found.
+        """
+        return await self._get_hash(self._session_key(session_id))
+
+    async def get_session_by_user_id(self, user_id: str) -> Optional[dict]:
+        """
+        Get a session by user ID.
+
+        Args:
+            user_id: The user's ID (JWT sub).
+
+        Returns:
+            The session data or None if not found.
+        """
+        session_id = await self._redis.get(self._user_key(user_id))
+        if session_id:
+            return await self.get_session(session_id)
+        return None
+
+    async def update_last_activity(self, session_id: str) -> bool:
+        """
+        Update the last activity timestamp for a session.
+
+        Args:
+            session_id: The session ID.
+
+        Returns:
+            True if updated, False if session not found.
+        """
+        return await self._set_fields(
+            self._session_key(session_id),
+            {"last_activity": _to_iso(datetime.now(timezone.utc))}
+        )
+
+    async def update_session_status(self, session_id: str, status: str) -> bool:
+        """
+        Update the status of a session.
+
+        Args:
+            session_id: The session ID.
+            status: The new status (active, idle, expired).
+
+        Returns:
+            True if updated, False if session not found.
+        """
+        return await self._set_fields(self._session_key(session_id), {"status": status})
+
+    async def invalidate_session(self, session_id: str) -> bool:
+        """
+        Invalidate and remove a session.
+
+        Args:
+            session_id: The session ID.
+
+        Returns:
+            True if invalidated, False if session not found.
+        """
+        user_id = await self._redis.hget(self._session_key(session_id), "user_id")
+        if user_id is not None:
+            user_id = json.loads(user_id)
+
+            async with self._redis.pipeline(transaction=True) as pipe:
+                pipe.delete(
+                    self._session_key(session_id),
+                    self._conversation_key(session_id),
+                    self._cache_key(session_id)
+                )
+                await pipe.execute()
+
+            if user_id and await self._redis.get(self._user_key(user_id)) == session_id:
+                await self._redis.delete(self._user_key(user_id))
+
+            logger.debug("[SESSION_STORE] Invalidated session %s", session_id)
+            return True
+        return False
+
+    async def add_message(
+        self,
+        session_id: str,
+        role: str,
+        content: str,
+        tools_used: List[str] = None,
+        metadata: dict = None
+    ) -> Optional[dict]:
+        """
+        Add a message to a session's conversation history.
+
+        Args:
+            session_id: The session ID.
+            role: The message role (user, assistant).
+            content: The message content.
+            tools_used: List of tools used in this message.
+            metadata: Additional metadata.
+
+        Returns:
+            The created message or None if session not found.
+        """
+        ttl = await self._redis.ttl(self._session_key(session_id))
+        if ttl < 0:
+            return None
+
+        message_id = str(uuid.uuid4())
+        message = {
+            "message_id": message_id,
+            "session_id": session_id,
+            "role": role,
+            "content": content,
+            "timestamp": _to_iso(datetime.now(timezone.utc)),
+            "tools_used": tools_used or [],
+            "metadata": metadata or {}
+        }
+
+        conv_key = self._conversation_key(session_id)
+        async with self._redis.pipeline(transaction=True) as pipe:
+            pipe.rpush(conv_key, json.dumps(message, default=str))
+            pipe.ltrim(conv_key, -MAX_CONVERSATION_MESSAGES, -1)
+            pipe.expire(conv_key, ttl)
+            pipe.lrange(conv_key, -CACHE_LAST_MESSAGES, -1)
+            last_messages = (await pipe.execute())[-1]
+
+        # Update cache with last messages
+        await self.update_cache(session_id, {"last_messages": [json.loads(m) for m in last_messages]})
+
+        # Update last activity
+        await self.update_last_activity(session_id)
+
+        return message
+
+    async def get_conversation(
+        self,
+        session_id: str,
+        limit: int = None,
+        offset: int = 0
+    ) -> List[dict]:
+        """
+        Get conversation history for a session.
+
+        Args:
+            session_id: The session ID.
+            limit: Maximum number of messages to return.
+            offset: Number of messages to skip from the end.
+
+        Returns:
+            List of messages.
+        """
+        if limit:
+            messages = await self._redis.lrange(
+                self._conversation_key(session_id), -(limit + offset), -(offset + 1)
+            )
+        else:
+            messages = await self._redis.lrange(self._conversation_key(session_id), 0, -1)
+
+        return [json.loads(m) for m in messages]
+
+    async def get_cache(self, session_id: str) -> Optional[dict]:
+        """
+        Get the cache data for a session.
+
+        Args:
+            session_id: The session ID.
+
+        Returns:
+            The cache data or None if not found.
+        """
+        return await self._get_hash(self._cache_key(session_id))
+
+    async def update_cache(self, session_id: str, data: dict) -> bool:
+        """
+        Update the cache data for a session.
+
+        This merges the provided data with existing cache.
+
+        Args:
+            session_id: The session ID.
+            data: The data to merge into the cache.
+
+        Returns:
+            True if updated, False if session not found.
+        """
+        if not data:
+            return bool(await self._redis.exists(self._cache_key(session_id)))
+        return await self._set_fields(self._cache_key(session_id), data)
+
+    async def update_state(self, session_id: str, state: dict) -> bool:
+        """
+        Update the state in the session cache.
+
+        Args:
+            session_id: The session ID.
+            state: The state data to set.
+
+        Returns:
+            True if updated, False if session not found.
+        """
+        return await self.update_cache(session_id, {"state": state})
+
+    async def get_state(self, session_id: str) -> Optional[dict]:
+        """
+        Get the state from the session cache.
+
+        Args:
+            session_id: The session ID.
+
+        Returns:
+            The state data or None if not found.
+        """
+        cache = await self.get_cache(session_id)
+        if cache:
+            return cache.get("state", {})
+        return None
+
+    async def update_user_preferences(self, session_id: str, preferences: dict) -> bool:
+        """
+        Update user preferences in the session cache.
+
+        Args:
+            session_id: The session ID.
+            preferences: The preferences to set.
+
+        Returns:
+            True if updated, False if session not found.
+        """
+        key = self._cache_key(session_id)
+
+        # Nested merge: WATCH retries if another worker changes the cache meanwhile
+        async def merge(pipe) -> bool:
+            current = await pipe.hget(key, "user_preferences")
+            if current is None and not await pipe.exists(key):
+                return False
+            merged = json.loads(current) if current is not None else {}
+            merged.update(preferences)
+            pipe.multi()
+            pipe.hset(key, "user_preferences", json.dumps(merged, default=str))
+            return True
+
+        return await self._redis.transaction(merge, key, value_from_callable=True)
+
+    async def clear_conversation(self, session_id: str) -> bool:
+        """
+        Clear the conversation history for a session.
+
+        Args:
+            session_id: The session ID.
+
+        Returns:
+            True if cleared, False if session not found.
+        """
+        if not await self._redis.exists(self._session_key(session_id)):
+            return False
+
+        await self._redis.delete(self._conversation_key(session_id))
+        await self.update_cache(session_id, {"last_messages": [], "conversation_summary": ""})
+
+        return True
+
+    async def get_session_info(self, session_id: str) -> Optional[dict]:
+        """
+        Get comprehensive session information.
+
+        Args:
+            session_id: The session ID.
+
+        Returns:
+            dict with session info, conversation count, and cache summary.
+        """
+        session = await self.get_session(session_id)
+        if not session:
+            return None
+
+        conversation_count = await self._redis.llen(self._conversation_key(session_id))
+        cache = await self.get_cache(session_id) or {}
+
+        # Don't expose bearer_token
+        safe_session = {k: v for k, v in session.items() if k != "bearer_token"}
+
+        return {
+            "session": safe_session,
+            "conversation_count": conversation_count,
+            "cache_summary": {
+                "has_conversation_summary": bool(cache.get("conversation_summary")),
+                "user_preferences": cache.get("user_preferences", {}),
+                "state_keys": list(cache.get("state", {}).keys())
+            }
+        }
+
+    async def _iter_sessions(self):
+        """Yield every stored session (SCAN, so it doesn't block Redis)."""
+        async for key in self._redis.scan_iter(match="session:*"):
+            session = await self._get_hash(key)
+            if session:
+                yield session
+
+    async def check_idle_sessions(self) -> List[str]:
+        """
+        Check for and mark idle sessions.
+
+        Sessions with no activity for IDLE_TIMEOUT_MINUTES are marked as idle.
+
+        Returns:
+            List of session IDs that were marked as idle.
+        """
+        idle_threshold = datetime.now(timezone.utc) - timedelta(minutes=IDLE_TIMEOUT_MINUTES)
+        marked_idle = []
+
+        async for session in self._iter_sessions():
+            if session.get("status") == "active":
+                last_activity_str = session.get("last_activity")
+                if last_activity_str:
+                    last_activity = datetime.fromisoformat(
+                        last_activity_str.replace("Z", "")
+                    ).replace(tzinfo=timezone.utc)
+                    if last_activity < idle_threshold:
+                        await self.update_session_status(session["session_id"], "idle")
+                        marked_idle.append(session["session_id"])
+
+        return marked_idle
+
+    async def cleanup_expired_sessions(self) -> List[str]:
+        """
+        Remove expired sessions.
+
+        Redis expires session keys on its own, so there is nothing to sweep.
+
+        Returns:
+            An empty list.
+        """
+        return []
+
+    async def get_active_session_count(self) -> int:
+        """Get the count of active sessions."""
+        return sum([1 async for s in self._iter_sessions() if s.get("status") == "active"])
+
+    async def get_all_sessions_summary(self) -> List[dict]:
+        """Get a summary of all sessions (for admin/debug)."""
+        return [
+            {
+                "session_id": session.get("session_id"),
+                "user_id": session.get("user_id"),
+                "email": session.get("email"),
+                "status": session.get("status"),
+                "created_at": session.get("created_at"),
+                "last_activity": session.get("last_activity")
+            }
+            async for session in self._iter_sessions()
+        ]
@@ -22,17 +22,91 @@ Data Structures:
 
 import os
 import json
+import time
 import uuid
+import heapq
 import asyncio
-from datetime import datetime, timedelta
-from typing import Optional, List, Dict, Any
+import logging
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from datetime import datetime, timezone
+from typing import Optional, List, Dict, Any, Tuple
 from pathlib import Path
 
+try:
+    import orjson
+except ImportError:  # fall back to the stdlib encoder
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
 # Session configuration
 SESSION_TIMEOUT_MINUTES = int(os.getenv("SESSION_TIMEOUT_MINUTES", "1"))  # Default 1 minute
 IDLE_TIMEOUT_MINUTES = int(os.getenv("IDLE_TIMEOUT_MINUTES", "5"))
 MAX_CONVERSATION_MESSAGES = int(os.getenv("MAX_CONVERSATION_MESSAGES", "100"))
 
+# Threads used to read session files at startup
+LOAD_WORKERS = int(os.getenv("SESSION_LOAD_WORKERS", "8"))
+
+# Number of recent messages mirrored into the session cache
+CACHE_LAST_MESSAGES = 10
+
+# Sentinel for "key not present" in change checks
+_MISSING = object()
+
+
+def _changed(current: Any, value: Any) -> bool:
+    """
+    Whether assigning value over current changes anything.
+    
+    A container passed back as the same object (e.g. the dict get_state()
+    returned, mutated in place) can't be compared, so it counts as changed.
+    """
+    if current is value:
+        return isinstance(value, (dict, list))
+    return current != value
+
+# Dirty files are written by a background task, coalescing bursts of mutations
+SAVE_DEBOUNCE_SECONDS = float(os.getenv("SESSION_SAVE_DEBOUNCE_MS", "200")) / 1000
+
+# activity.log is rewritten with one line per session once it grows past this many lines
+ACTIVITY_LOG_MAX_LINES = int(os.getenv("SESSION_ACTIVITY_LOG_MAX_LINES", "10000"))
+
+
+def _json_default(obj: Any) -> Any:
+    """Serializer fallback: conversations are deques, everything else is str()'d."""
+    if isinstance(obj, deque):
+        return list(obj)
+    return str(obj)
+
+
+def _dumps(obj: Any) -> bytes:
+    """Serialize to compact JSON bytes (orjson when available)."""
+    if orjson is not None:
+        return orjson.dumps(obj, default=_json_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, default=_json_default, separators=(",", ":")).encode()
+
+
+_loads = orjson.loads if orjson is not None else json.loads
+
+
+def _iso(ts: float) -> str:
+    """Format epoch seconds as a millisecond-precision "...Z" ISO timestamp."""
+    return time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(ts)) + f".{int(ts % 1 * 1000):03d}Z"
+
+
+def _iso_to_ts(value: str) -> float:
+    """Epoch seconds for a stored "...Z" ISO timestamp."""
+    return datetime.fromisoformat(value.replace("Z", "")).replace(tzinfo=timezone.utc).timestamp()
+
+
+# Persistence backend: "file" (JSON files per session), "sqlite" or "redis"
+SESSION_STORE_BACKEND = os.getenv(
+    "SESSION_STORE_BACKEND", "redis" if os.getenv("REDIS_URL") else "file"
+).lower()
+
 # Storage directory
 SESSION_STORE_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "auth", "sessions")
 
@@ -43,6 +117,8 @@ class SessionStore:
     
     For production, consider using Redis or a database.
     This implementation uses file storage for persistence across restarts.
+    The bearer token is kept in memory only, and last_activity updates are
+    appended to activity.log instead of rewriting the session file.
     
     Session data structure:
     {
@@ -69,7 +145,7 @@ class SessionStore:
     Cache data structure:
     {
         "session_id": "uuid",
-        "last_messages": [...],
+        "last_messages": [...],  (computed from the conversation on read)
         "conversation_summary": "...",
         "user_preferences": {...},
         "state": {...}
@@ -85,84 +161,345 @@ class SessionStore:
         """
         self.storage_dir = storage_dir or SESSION_STORE_DIR
         
+        # Path prefixes, joined once (file paths are built on every save)
+        self._session_prefix = os.path.join(self.storage_dir, "session_")
+        self._conversation_prefix = os.path.join(self.storage_dir, "conversation_")
+        self._cache_prefix = os.path.join(self.storage_dir, "cache_")
+        
         # In-memory caches
         self._sessions: Dict[str, dict] = {}  # session_id -> session data
         self._user_sessions: Dict[str, str] = {}  # user_id -> session_id
-        self._conversations: Dict[str, List[dict]] = {}  # session_id -> messages
+        self._conversations: Dict[str, deque] = {}  # session_id -> messages (bounded)
         self._caches: Dict[str, dict] = {}  # session_id -> cache data
         
+        # Sweep indexes: (epoch, session_id) heaps. Entries are never updated in
+        # place; stale ones are skipped when popped (checked against the session).
+        self._expiry_heap: List[Tuple[float, str]] = []
+        self._idle_heap: List[Tuple[float, str]] = []
+        
+        # Pending writes: (kind, key) -> object to persist
+        self._dirty: Dict[Tuple[str, Any], Any] = {}
+        self._flush_event: Optional[asyncio.Event] = None
+        self._flush_task: Optional[asyncio.Task] = None
+        # One flush at a time, so a later snapshot is never written before an earlier one
+        self._flush_lock: Optional[asyncio.Lock] = None
+        self._flush_lock_loop: Optional[asyncio.AbstractEventLoop] = None
+        # Lines currently in activity.log, to know when to compact it
+        self._activity_log_lines = 0
+        
         # Ensure storage directory exists
         Path(self.storage_dir).mkdir(parents=True, exist_ok=True)
         
         # Load existing sessions from disk
         self._load_sessions()
+        self._index_sessions()
     
     def _get_session_file(self, session_id: str) -> str:
         """Get the file path for a session."""
-        return os.path.join(self.storage_dir, f"session_{session_id}.json")
+        return self._session_prefix + session_id + ".json"
     
     def _get_conversation_file(self, session_id: str) -> str:
         """Get the file path for a session's conversation."""
-        return os.path.join(self.storage_dir, f"conversation_{session_id}.json")
+        return self._conversation_prefix + session_id + ".json"
     
     def _get_cache_file(self, session_id: str) -> str:
         """Get the file path for a session's cache."""
-        return os.path.join(self.storage_dir, f"cache_{session_id}.json")
+        return self._cache_prefix + session_id + ".json"
+    
+    def _get_activity_log(self) -> str:
+        """Get the path of the append-only last-activity log."""
+        return os.path.join(self.storage_dir, "activity.log")
+    
+    def _load_session_files(self, filename: str) -> Optional[Tuple[dict, Optional[list], Optional[dict]]]:
+        """
+        Read one session and its conversation and cache files.
+        
+        Returns:
+            (session, conversation, cache), with None for missing files,
+            or None if the session can't be loaded.
+        """
+        filepath = os.path.join(self.storage_dir, filename)
+        try:
+            with open(filepath, "rb") as f:
+                session = _loads(f.read())
+            session_id = session.get("session_id")
+            if not session_id:
+                return None
+            
+            # Load conversation
+            conversation = None
+            conv_file = self._get_conversation_file(session_id)
+            if os.path.exists(conv_file):
+                with open(conv_file, "rb") as cf:
+                    conversation = _loads(cf.read())
+            
+            # Load cache (last_messages from older files is now derived on read)
+            cache = None
+            cache_file = self._get_cache_file(session_id)
+            if os.path.exists(cache_file):
+                with open(cache_file, "rb") as cf:
+                    cache = _loads(cf.read())
+                cache.pop("last_messages", None)
+            
+            return session, conversation, cache
+        except Exception as e:
+            logger.error("[SESSION_STORE] Error loading session %s: %s", filename, e)
+            return None
     
     def _load_sessions(self):
-        """Load all sessions from disk on startup."""
+        """Load all sessions from disk on startup (files are read in parallel)."""
         try:
-            for filename in os.listdir(self.storage_dir):
-                if filename.startswith("session_") and filename.endswith(".json"):
-                    filepath = os.path.join(self.storage_dir, filename)
+            filenames = [
+                filename for filename in os.listdir(self.storage_dir)
+                if filename.startswith("session_") and filename.endswith(".json")
+            ]
+        except FileNotFoundError:
+            filenames = []
+        
+        if filenames:
+            with ThreadPoolExecutor(max_workers=min(LOAD_WORKERS, len(filenames))) as pool:
+                # map() keeps directory order, so merging matches a serial load
+                for loaded in pool.map(self._load_session_files, filenames):
+                    if loaded is None:
+                        continue
+                    session, conversation, cache = loaded
+                    session_id = session["session_id"]
+                    user_id = session.get("user_id")
+                    
+                    self._sessions[session_id] = session
+                    if user_id:
+                        self._user_sessions[user_id] = session_id
+                    if conversation is not None:
+                        self._conversations[session_id] = deque(conversation, maxlen=MAX_CONVERSATION_MESSAGES)
+                    if cache is not None:
+                        self._caches[session_id] = cache
+        
+        self._replay_activity_log()
+    
+    def _replay_activity_log(self):
+        """
+        Apply the activity log to the loaded sessions, then compact it.
+        
+        Each line is "session_id,epoch"; the latest entry per session wins.
+        """
+        filepath = self._get_activity_log()
+        latest: Dict[str, float] = {}
+        
+        try:
+            with open(filepath, "r") as f:
+                for line in f:
+                    session_id, _, ts = line.strip().partition(",")
                     try:
-                        with open(filepath, "r") as f:
-                            session = json.load(f)
-                            session_id = session.get("session_id")
-                            user_id = session.get("user_id")
-                            
-                            if session_id:
-                                self._sessions[session_id] = session
-                                if user_id:
-                                    self._user_sessions[user_id] = session_id
-                                
-                                # Load conversation
-                                conv_file = self._get_conversation_file(session_id)
-                                if os.path.exists(conv_file):
-                                    with open(conv_file, "r") as cf:
-                                        self._conversations[session_id] = json.load(cf)
-                                
-                                # Load cache
-                                cache_file = self._get_cache_file(session_id)
-                                if os.path.exists(cache_file):
-                                    with open(cache_file, "r") as cf:
-                                        self._caches[session_id] = json.load(cf)
-                    except Exception as e:
-                        print(f"[SESSION_STORE] Error loading session {filename}: {e}")
+                        latest[session_id] = float(ts)
+                    except ValueError:
+                        continue  # torn write from a crash
         except FileNotFoundError:
-            pass
+            return
+        
+        for session_id, ts in latest.items():
+            session = self._sessions.get(session_id)
+            if session is not None and ts > session.get("last_activity_ts", 0):
+                session["last_activity"] = _iso(ts)
+                session["last_activity_ts"] = ts
+        
+        # Rewrite with one line per live session
+        self._rewrite_activity_log(self._activity_snapshot())
+    
+    def _activity_snapshot(self) -> bytes:
+        """Serialize one "session_id,epoch" line per live session."""
+        lines = [
+            f"{session_id},{session['last_activity_ts']!r}\n"
+            for session_id, session in self._sessions.items()
+            if "last_activity_ts" in session
+        ]
+        self._activity_log_lines = len(lines)
+        return "".join(lines).encode()
+    
+    def _rewrite_activity_log(self, data: bytes):
+        """Replace activity.log with a compacted snapshot."""
+        filepath = self._get_activity_log()
+        tmp_path = filepath + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, filepath)
+    
+    def _index_sessions(self):
+        """Build the expiry/idle heaps from the loaded sessions."""
+        self._expiry_heap = []
+        self._idle_heap = []
+        
+        for session_id, session in self._sessions.items():
+            try:
+                if "expires_at_ts" not in session and session.get("expires_at"):
+                    session["expires_at_ts"] = _iso_to_ts(session["expires_at"])
+                if "last_activity_ts" not in session and session.get("last_activity"):
+                    session["last_activity_ts"] = _iso_to_ts(session["last_activity"])
+            except ValueError:
+                continue
+            
+            if "expires_at_ts" in session:
+                self._expiry_heap.append((session["expires_at_ts"], session_id))
+            if "last_activity_ts" in session:
+                self._idle_heap.append((session["last_activity_ts"], session_id))
+        
+        heapq.heapify(self._expiry_heap)
+        heapq.heapify(self._idle_heap)
+    
+    def _push_idle(self, session_id: str, ts: float):
+        """Index a session's latest activity time for the idle sweep."""
+        heapq.heappush(self._idle_heap, (ts, session_id))
+        
+        # Every activity update leaves a stale entry behind; rebuild when they dominate
+        if len(self._idle_heap) > 2 * len(self._sessions) + 64:
+            self._idle_heap = [
+                (session["last_activity_ts"], sid)
+                for sid, session in self._sessions.items()
+                if "last_activity_ts" in session
+            ]
+            heapq.heapify(self._idle_heap)
     
     def _save_session(self, session_id: str):
-        """Save a session to disk."""
+        """Schedule a session to be saved to disk."""
         session = self._sessions.get(session_id)
         if session:
-            filepath = self._get_session_file(session_id)
-            with open(filepath, "w") as f:
-                json.dump(session, f, indent=2, default=str)
+            self._mark_dirty("session", session_id, session)
     
     def _save_conversation(self, session_id: str):
-        """Save a session's conversation to disk."""
-        conversation = self._conversations.get(session_id, [])
-        filepath = self._get_conversation_file(session_id)
-        with open(filepath, "w") as f:
-            json.dump(conversation, f, indent=2, default=str)
+        """Schedule a session's conversation to be saved to disk."""
+        self._mark_dirty("conversation", session_id, self._conversations.get(session_id, ()))
     
     def _save_cache(self, session_id: str):
-        """Save a session's cache to disk."""
-        cache = self._caches.get(session_id, {})
-        filepath = self._get_cache_file(session_id)
-        with open(filepath, "w") as f:
-            json.dump(cache, f, indent=2, default=str)
+        """Schedule a session's cache to be saved to disk."""
+        self._mark_dirty("cache", session_id, self._caches.get(session_id, {}))
+    
+    def _persist_message(self, session_id: str, message: dict):
+        """Schedule a newly added message to be saved to disk."""
+        self._save_conversation(session_id)
+    
+    def _get_file(self, kind: str, session_id: str) -> str:
+        """Get the file path for a (kind, session_id) dirty entry."""
+        if kind == "session":
+            return self._get_session_file(session_id)
+        if kind == "conversation":
+            return self._get_conversation_file(session_id)
+        return self._get_cache_file(session_id)
+    
+    def _mark_dirty(self, kind: str, key: Any, obj: Any):
+        """
+        Queue an object for persistence.
+        
+        Repeated mutations of the same object before the next flush collapse
+        into a single write. Outside an event loop the write happens inline.
+        """
+        # Re-insert so pending writes stay in the order they were last made
+        self._dirty.pop((kind, key), None)
+        self._dirty[(kind, key)] = obj
+        
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self._write_dirty(self._serialize_dirty())
+            return
+        
+        if self._flush_task is None or self._flush_task.done() or self._flush_task.get_loop() is not loop:
+            self._flush_event = asyncio.Event()
+            self._flush_task = loop.create_task(self._flusher())
+        self._flush_event.set()
+    
+    def _serialize_dirty(self) -> List[Tuple[str, Any, bytes]]:
+        """Snapshot and clear the dirty set as (kind, key, json) triples."""
+        dirty, self._dirty = self._dirty, {}
+        payloads = []
+        appended = 0
+        for (kind, key), obj in dirty.items():
+            if kind == "session":
+                # The bearer token never goes to disk
+                obj = {k: v for k, v in obj.items() if k != "bearer_token"}
+            elif kind == "activity":
+                appended += 1
+            payloads.append((kind, key, _dumps(obj)))
+        
+        self._activity_log_lines += appended
+        # Compact once stale lines dominate; the snapshot already holds every appended update
+        if self._activity_log_lines > max(ACTIVITY_LOG_MAX_LINES, 2 * len(self._sessions)):
+            payloads = [p for p in payloads if p[0] != "activity"]
+            payloads.append(("activity_log", None, self._activity_snapshot()))
+        return payloads
+    
+    def _write_dirty(self, payloads: List[Tuple[str, Any, bytes]]):
+        """Write serialized payloads to disk."""
+        activity = []
+        
+        for kind, session_id, data in payloads:
+            if kind == "activity":
+                activity.append(f"{session_id},".encode() + data + b"\n")
+                continue
+            
+            if kind == "activity_log":
+                try:
+                    self._rewrite_activity_log(data)
+                except OSError as e:
+                    logger.error("[SESSION_STORE] Error compacting activity log: %s", e)
+                continue
+            
+            if kind == "delete":
+                for filepath in (
+                    self._get_session_file(session_id),
+                    self._get_conversation_file(session_id),
+                    self._get_cache_file(session_id)
+                ):
+                    try:
+                        os.unlink(filepath)
+                    except FileNotFoundError:
+                        pass
+                    except OSError as e:
+                        logger.error("[SESSION_STORE] Error deleting %s: %s", filepath, e)
+                continue
+            
+            # Write to a temp file and rename so readers never see a torn file
+            filepath = self._get_file(kind, session_id)
+            tmp_path = filepath + ".tmp"
+            try:
+                with open(tmp_path, "wb") as f:
+                    f.write(data)
+                os.replace(tmp_path, filepath)
+            except OSError as e:
+                logger.error("[SESSION_STORE] Error saving %s: %s", filepath, e)
+        
+        if activity:
+            try:
+                with open(self._get_activity_log(), "ab") as f:
+                    f.write(b"".join(activity))
+            except OSError as e:
+                logger.error("[SESSION_STORE] Error saving activity log: %s", e)
+    
+    async def _flusher(self):
+        """Background task that writes dirty files after a short debounce."""
+        event = self._flush_event
+        while True:
+            await event.wait()
+            event.clear()
+            await asyncio.sleep(SAVE_DEBOUNCE_SECONDS)
+            await self.flush()
+    
+    async def flush(self):
+        """
+        Write all pending changes to disk.
+        
+        Call on shutdown so no queued mutations are lost. Flushes are
+        serialized with the background flusher, so an explicit flush can't
+        write an older snapshot after a newer one (e.g. a session after its
+        delete).
+        """
+        loop = asyncio.get_running_loop()
+        if self._flush_lock is None or self._flush_lock_loop is not loop:
+            self._flush_lock = asyncio.Lock()
+            self._flush_lock_loop = loop
+        
+        async with self._flush_lock:
+            if self._dirty:
+                # Serialize on the loop so the snapshot is consistent, write off it
+                await asyncio.to_thread(self._write_dirty, self._serialize_dirty())
     
     async def create_session(
         self,
@@ -195,8 +532,9 @@ class SessionStore:
         # Generate new session ID
         session_id = str(uuid.uuid4())
         
-        now = datetime.utcnow()
-        expires_at = now + timedelta(minutes=SESSION_TIMEOUT_MINUTES)
+        now_ts = time.time()
+        expires_at_ts = now_ts + SESSION_TIMEOUT_MINUTES * 60
+        now = _iso(now_ts)
         
         session = {
             "session_id": session_id,
@@ -204,9 +542,11 @@ class SessionStore:
             "email": email,
             "name": name,
             "bearer_token": bearer_token,
-            "created_at": now.isoformat() + "Z",
-            "last_activity": now.isoformat() + "Z",
-            "expires_at": expires_at.isoformat() + "Z",
+            "created_at": now,
+            "last_activity": now,
+            "expires_at": _iso(expires_at_ts),
+            "last_activity_ts": now_ts,
+            "expires_at_ts": expires_at_ts,
             "status": "active",
             "metadata": metadata or {}
         }
@@ -214,21 +554,22 @@ class SessionStore:
         # Store in memory
         self._sessions[session_id] = session
         self._user_sessions[user_id] = session_id
-        self._conversations[session_id] = []
+        self._conversations[session_id] = deque(maxlen=MAX_CONVERSATION_MESSAGES)
         self._caches[session_id] = {
             "session_id": session_id,
-            "last_messages": [],
             "conversation_summary": "",
             "user_preferences": {},
             "state": {}
         }
+        heapq.heappush(self._expiry_heap, (expires_at_ts, session_id))
+        self._push_idle(session_id, now_ts)
         
         # Persist to disk
         self._save_session(session_id)
         self._save_conversation(session_id)
         self._save_cache(session_id)
         
-        print(f"[SESSION_STORE] Created session {session_id} for user {user_id}")
+        logger.debug("[SESSION_STORE] Created session %s for user %s", session_id, user_id)
         
         return session
     
@@ -271,8 +612,12 @@ class SessionStore:
         """
         session = self._sessions.get(session_id)
         if session:
-            session["last_activity"] = datetime.utcnow().isoformat() + "Z"
-            self._save_session(session_id)
+            now_ts = time.time()
+            session["last_activity"] = _iso(now_ts)
+            session["last_activity_ts"] = now_ts
+            self._push_idle(session_id, now_ts)
+            # A one-line append to the activity log, not a session file rewrite
+            self._mark_dirty("activity", session_id, now_ts)
             return True
         return False
     
@@ -289,14 +634,19 @@ class SessionStore:
         """
         session = self._sessions.get(session_id)
         if session:
+            if session.get("status") == status:
+                return True
             session["status"] = status
+            if status == "active" and "last_activity_ts" in session:
+                # Re-arm the idle sweep for a reactivated session
+                self._push_idle(session_id, session["last_activity_ts"])
             self._save_session(session_id)
             return True
         return False
     
     async def invalidate_session(self, session_id: str) -> bool:
         """
-        Invalidate and remove a session.
+        Invalidate and remove a session, deleting its persisted files.
         
         Args:
             session_id: The session ID.
@@ -304,29 +654,32 @@ class SessionStore:
         Returns:
             True if invalidated, False if session not found.
         """
-        session = self._sessions.get(session_id)
-        if session:
-            user_id = session.get("user_id")
-            
-            # Update status before removal
-            session["status"] = "expired"
-            self._save_session(session_id)
-            
-            # Remove from memory
-            del self._sessions[session_id]
-            if user_id and self._user_sessions.get(user_id) == session_id:
-                del self._user_sessions[user_id]
-            
-            # Remove conversation and cache
-            if session_id in self._conversations:
-                del self._conversations[session_id]
-            if session_id in self._caches:
-                del self._caches[session_id]
-            
-            print(f"[SESSION_STORE] Invalidated session {session_id}")
+        if self._remove_session(session_id):
+            logger.debug("[SESSION_STORE] Invalidated session %s", session_id)
             return True
         return False
     
+    def _remove_session(self, session_id: str) -> bool:
+        """Drop a session from memory and queue deletion of its files."""
+        session = self._sessions.pop(session_id, None)
+        if session is None:
+            return False
+        
+        # Pending writes for the session are moot once its files are deleted
+        for kind, key in list(self._dirty):
+            if key == session_id or (isinstance(key, tuple) and key[0] == session_id):
+                del self._dirty[(kind, key)]
+        self._mark_dirty("delete", session_id, None)
+        
+        user_id = session.get("user_id")
+        if user_id and self._user_sessions.get(user_id) == session_id:
+            del self._user_sessions[user_id]
+        
+        # Remove conversation and cache
+        self._conversations.pop(session_id, None)
+        self._caches.pop(session_id, None)
+        return True
+    
     async def add_message(
         self,
         session_id: str,
@@ -357,29 +710,19 @@ class SessionStore:
             "session_id": session_id,
             "role": role,
             "content": content,
-            "timestamp": datetime.utcnow().isoformat() + "Z",
+            "timestamp": _iso(time.time()),
             "tools_used": tools_used or [],
             "metadata": metadata or {}
         }
         
-        # Add to conversation
+        # Add to conversation (the deque drops the oldest past MAX_CONVERSATION_MESSAGES)
         self._conversations[session_id].append(message)
         
-        # Trim if too many messages
-        if len(self._conversations[session_id]) > MAX_CONVERSATION_MESSAGES:
-            self._conversations[session_id] = self._conversations[session_id][-MAX_CONVERSATION_MESSAGES:]
-        
-        # Update cache with last messages
-        cache = self._caches.get(session_id, {})
-        cache["last_messages"] = self._conversations[session_id][-10:]  # Keep last 10 in cache
-        self._caches[session_id] = cache
-        
         # Update last activity
         await self.update_last_activity(session_id)
         
-        # Persist
-        self._save_conversation(session_id)
-        self._save_cache(session_id)
+        # Persist (the cache's last_messages is derived, so the cache is untouched)
+        self._persist_message(session_id, message)
         
         return message
     
@@ -400,14 +743,14 @@ class SessionStore:
         Returns:
             List of messages.
         """
-        conversation = self._conversations.get(session_id, [])
+        conversation = self._conversations.get(session_id, ())
         
-        if limit:
-            if offset:
-                return conversation[-(limit + offset):-offset] if offset < len(conversation) else []
-            return conversation[-limit:]
+        if not limit:
+            return list(conversation)
         
-        return conversation
+        # Copy just the requested window out of the deque
+        end = len(conversation) - offset
+        return list(islice(conversation, max(0, end - limit), max(0, end)))
     
     async def get_cache(self, session_id: str) -> Optional[dict]:
         """
@@ -417,9 +760,16 @@ class SessionStore:
             session_id: The session ID.
             
         Returns:
-            The cache data or None if not found.
+            The cache data or None if not found. last_messages holds the
+            most recent CACHE_LAST_MESSAGES messages of the conversation.
         """
-        return self._caches.get(session_id)
+        cache = self._caches.get(session_id)
+        if cache is None:
+            return None
+        
+        conversation = self._conversations.get(session_id, ())
+        last_messages = list(islice(conversation, max(0, len(conversation) - CACHE_LAST_MESSAGES), None))
+        return {**cache, "last_messages": last_messages}
     
     async def update_cache(self, session_id: str, data: dict) -> bool:
         """
@@ -434,11 +784,14 @@ class SessionStore:
         Returns:
             True if updated, False if session not found.
         """
-        if session_id not in self._caches:
+        cache = self._caches.get(session_id)
+        if cache is None:
             return False
         
-        self._caches[session_id].update(data)
-        self._save_cache(session_id)
+        # Only queue a write when something actually changed
+        if any(_changed(cache.get(key, _MISSING), value) for key, value in data.items()):
+            cache.update(data)
+            self._save_cache(session_id)
         return True
     
     async def update_state(self, session_id: str, state: dict) -> bool:
@@ -455,9 +808,7 @@ class SessionStore:
         if session_id not in self._caches:
             return False
         
-        self._caches[session_id]["state"] = state
-        self._save_cache(session_id)
-        return True
+        return await self.update_cache(session_id, {"state": state})
     
     async def get_state(self, session_id: str) -> Optional[dict]:
         """
@@ -489,9 +840,10 @@ class SessionStore:
             return False
         
         current_prefs = self._caches[session_id].get("user_preferences", {})
-        current_prefs.update(preferences)
-        self._caches[session_id]["user_preferences"] = current_prefs
-        self._save_cache(session_id)
+        if any(_changed(current_prefs.get(key, _MISSING), value) for key, value in preferences.items()):
+            current_prefs.update(preferences)
+            self._caches[session_id]["user_preferences"] = current_prefs
+            self._save_cache(session_id)
         return True
     
     async def clear_conversation(self, session_id: str) -> bool:
@@ -507,11 +859,10 @@ class SessionStore:
         if session_id not in self._conversations:
             return False
         
-        self._conversations[session_id] = []
+        self._conversations[session_id].clear()
         
-        # Clear cache last_messages too
+        # Clear the conversation summary too
         if session_id in self._caches:
-            self._caches[session_id]["last_messages"] = []
             self._caches[session_id]["conversation_summary"] = ""
         
         self._save_conversation(session_id)
@@ -554,22 +905,29 @@ class SessionStore:
         Check for and mark idle sessions.
         
         Sessions with no activity for IDLE_TIMEOUT_MINUTES are marked as idle.
+        Only sessions whose last activity is past the threshold are visited.
         
         Returns:
             List of session IDs that were marked as idle.
         """
-        now = datetime.utcnow()
-        idle_threshold = now - timedelta(minutes=IDLE_TIMEOUT_MINUTES)
+        idle_threshold = time.time() - IDLE_TIMEOUT_MINUTES * 60
         marked_idle = []
         
-        for session_id, session in list(self._sessions.items()):
+        while self._idle_heap and self._idle_heap[0][0] < idle_threshold:
+            ts, session_id = heapq.heappop(self._idle_heap)
+            session = self._sessions.get(session_id)
+            
+            # Skip entries superseded by a later activity update
+            if session is None or session.get("last_activity_ts") != ts:
+                continue
+            
             if session.get("status") == "active":
-                last_activity_str = session.get("last_activity")
-                if last_activity_str:
-                    last_activity = datetime.fromisoformat(last_activity_str.replace("Z", ""))
-                    if last_activity < idle_threshold:
-                        await self.update_session_status(session_id, "idle")
-                        marked_idle.append(session_id)
+                session["status"] = "idle"
+                marked_idle.append(session_id)
+        
+        # One queued save per changed session, flushed together
+        for session_id in marked_idle:
+            self._save_session(session_id)
         
         return marked_idle
     
@@ -577,27 +935,35 @@ class SessionStore:
         """
         Remove expired sessions.
         
+        Only sessions whose expiry is past are visited.
+        
         Returns:
             List of session IDs that were removed.
         """
-        now = datetime.utcnow()
+        now = time.time()
         removed = []
         
-        for session_id, session in list(self._sessions.items()):
-            expires_at_str = session.get("expires_at")
-            if expires_at_str:
-                expires_at = datetime.fromisoformat(expires_at_str.replace("Z", ""))
-                if expires_at < now:
-                    await self.invalidate_session(session_id)
-                    removed.append(session_id)
+        while self._expiry_heap and self._expiry_heap[0][0] < now:
+            ts, session_id = heapq.heappop(self._expiry_heap)
+            session = self._sessions.get(session_id)
+            
+            if session is not None and session.get("expires_at_ts") == ts:
+                removed.append(session_id)
+        
+        # Remove in one batch after the scan
+        for session_id in removed:
+            self._remove_session(session_id)
+        
+        if removed:
+            logger.info("[SESSION_STORE] Removed %d expired sessions", len(removed))
         
         return removed
     
-    def get_active_session_count(self) -> int:
+    async def get_active_session_count(self) -> int:
         """Get the count of active sessions."""
         return sum(1 for s in self._sessions.values() if s.get("status") == "active")
     
-    def get_all_sessions_summary(self) -> List[dict]:
+    async def get_all_sessions_summary(self) -> List[dict]:
         """Get a summary of all sessions (for admin/debug)."""
         summaries = []
         for session_id, session in self._sessions.items():
@@ -614,18 +980,32 @@ class SessionStore:
 
 # Singleton session store instance
 _session_store = None
+_session_store_lock = threading.Lock()
 
 
 def get_session_store() -> SessionStore:
     """
     Get or create the session store singleton.
     
+    The backend is chosen by SESSION_STORE_BACKEND ("file", "sqlite" or
+    "redis"); it defaults to "redis" when REDIS_URL is set. Creation is
+    locked so concurrent first calls can't build two stores on the same files.
+    
     Returns:
         The SessionStore instance.
     """
     global _session_store
     
     if _session_store is None:
-        _session_store = SessionStore()
+        with _session_store_lock:
+            if _session_store is None:
+                if SESSION_STORE_BACKEND == "redis":
+                    from auth.redis_session_store import RedisSessionStore
+                    _session_store = RedisSessionStore()
+                elif SESSION_STORE_BACKEND == "sqlite":
+                    from auth.sqlite_session_store import SqliteSessionStore
+                    _session_store = SqliteSessionStore()
+                else:
+                    _session_store = SessionStore()
     
     return _session_store
@@ -0,0 +1,179 @@
+"""
+SQLite-backed Session Store for MCP Server.
+
+Drop-in replacement for the file-based SessionStore that keeps all sessions
+in a single SQLite database (WAL mode) instead of three JSON files per session:
+- sessions - one row per session
+- messages - one row per conversation message (appends are a single INSERT)
+- cache    - one row per session cache
+- activity - last activity time per session (kept apart from the session row)
+
+Select it with SESSION_STORE_BACKEND=sqlite.
+"""
+
+import os
+import logging
+import sqlite3
+import threading
+from collections import deque
+from pathlib import Path
+from typing import Any, List, Tuple
+
+from auth.session_store import (
+    SessionStore,
+    SESSION_STORE_DIR,
+    MAX_CONVERSATION_MESSAGES,
+    _dumps,
+    _loads,
+    _iso
+)
+
+logger = logging.getLogger(__name__)
+
+# Database location (defaults to <storage_dir>/sessions.db)
+SESSION_DB_PATH = os.getenv("SESSION_DB_PATH")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    session_id TEXT PRIMARY KEY,
+    data BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS messages (
+    id INTEGER PRIMARY KEY,
+    session_id TEXT NOT NULL,
+    message_id TEXT NOT NULL UNIQUE,
+    data BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_messages_session ON messages (session_id, id);
+CREATE TABLE IF NOT EXISTS cache (
+    session_id TEXT PRIMARY KEY,
+    data BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS activity (
+    session_id TEXT PRIMARY KEY,
+    ts REAL NOT NULL
+);
+"""
+
+
+class SqliteSessionStore(SessionStore):
+    """
+    Session store persisted to a single SQLite database.
+
+    Sessions are still served from memory; only persistence changes.
+    Adding a message writes one row instead of rewriting the whole
+    conversation, and trimming to MAX_CONVERSATION_MESSAGES is a DELETE.
+    """
+
+    def __init__(self, storage_dir: str = None, db_path: str = None):
+        """
+        Initialize the session store.
+
+        Args:
+            storage_dir: Directory for the database. Defaults to auth/sessions.
+            db_path: Path to the SQLite database. Defaults to SESSION_DB_PATH
+                or <storage_dir>/sessions.db.
+        """
+        storage_dir = storage_dir or SESSION_STORE_DIR
+        Path(storage_dir).mkdir(parents=True, exist_ok=True)
+
+        self.db_path = db_path or SESSION_DB_PATH or os.path.join(storage_dir, "sessions.db")
+
+        # Writes happen on worker threads; one connection, serialized by a lock
+        self._db_lock = threading.Lock()
+        self._db = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(_SCHEMA)
+
+        super().__init__(storage_dir)
+
+    def _load_sessions(self):
+        """Load all sessions from the database on startup."""
+        with self._db_lock:
+            sessions = self._db.execute("SELECT data FROM sessions").fetchall()
+            messages = self._db.execute("SELECT session_id, data FROM messages ORDER BY id").fetchall()
+            caches = self._db.execute("SELECT session_id, data FROM cache").fetchall()
+            activity = self._db.execute("SELECT session_id, ts FROM activity").fetchall()
+
+        for (data,) in sessions:
+            session = _loads(data)
+            session_id = session.get("session_id")
+            user_id = session.get("user_id")
+
+            if session_id:
+                self._sessions[session_id] = session
+                self._conversations[session_id] = deque(maxlen=MAX_CONVERSATION_MESSAGES)
+                if user_id:
+                    self._user_sessions[user_id] = session_id
+
+        for session_id, data in messages:
+            if session_id in self._conversations:
+                self._conversations[session_id].append(_loads(data))
+
+        for session_id, data in caches:
+            if session_id in self._sessions:
+                self._caches[session_id] = cache = _loads(data)
+                cache.pop("last_messages", None)
+
+        for session_id, ts in activity:
+            session = self._sessions.get(session_id)
+            if session is not None and ts > session.get("last_activity_ts", 0):
+                session["last_activity"] = _iso(ts)
+                session["last_activity_ts"] = ts
+
+    def _persist_message(self, session_id: str, message: dict):
+        """Schedule a single message row to be inserted."""
+        self._mark_dirty("message", (session_id, message["message_id"]), message)
+
+    def _write_dirty(self, payloads: List[Tuple[str, Any, bytes]]):
+        """Write serialized payloads to the database in one transaction."""
+        appended = set()
+
+        try:
+            with self._db_lock, self._db:
+                for kind, key, data in payloads:
+                    if kind == "session":
+                        self._db.execute(
+                            "INSERT OR REPLACE INTO sessions (session_id, data) VALUES (?, ?)",
+                            (key, data)
+                        )
+                    elif kind == "cache":
+                        self._db.execute(
+                            "INSERT OR REPLACE INTO cache (session_id, data) VALUES (?, ?)",
+                            (key, data)
+                        )
+                    elif kind == "conversation":
+                        # Full rewrite (create/clear); rare compared to appends
+                        self._db.execute("DELETE FROM messages WHERE session_id = ?", (key,))
+                        self._db.executemany(
+                            "INSERT INTO messages (session_id, message_id, data) VALUES (?, ?, ?)",
+                            [
+                                (key, message["message_id"], _dumps(message))
+                                for message in _loads(data)
+                            ]
+                        )
+                    elif kind == "delete":
+                        for table in ("sessions", "messages", "cache", "activity"):
+                            self._db.execute(f"DELETE FROM {table} WHERE session_id = ?", (key,))
+                    elif kind == "activity":
+                        self._db.execute(
+                            "INSERT OR REPLACE INTO activity (session_id, ts) VALUES (?, ?)",
+                            (key, float(data))
+                        )
+                    elif kind == "message":
+                        session_id, message_id = key
+                        self._db.execute(
+                            "INSERT OR REPLACE INTO messages (session_id, message_id, data) VALUES (?, ?, ?)",
+                            (session_id, message_id, data)
+                        )
+                        appended.add(session_id)
+
+                for session_id in appended:
+                    self._db.execute(
+                        "DELETE FROM messages WHERE session_id = ? AND id NOT IN "
+                        "(SELECT id FROM messages WHERE session_id = ? ORDER BY id DESC LIMIT ?)",
+                        (session_id, session_id, MAX_CONVERSATION_MESSAGES)
+                    )
+        except sqlite3.Error as e:
+            logger.error("[SESSION_STORE] Error saving to %s: %s", self.db_path, e)
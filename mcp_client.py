@@ -3,31 +3,47 @@ import anyio
 from agent.agent import Agent
 
 
-async def run_query(user_query: str):
-    """Run agent in anyio context so MCP stdio_client (anyio-based) works."""
-    agent = Agent()
+async def run_query(agent: Agent, user_query: str):
+    """Run a query on a shared agent so its MCP session is reused across queries."""
     return await agent.handle_query(user_query)
 
 
-def main():
-    print("===== CM AI SERVER STARTED =====")
+async def serve():
+    """
+    Run the REPL inside a single anyio event loop.
 
+    The Agent (and the MCP ClientSession it holds) lives for the whole loop,
+    so the in-process MCP handshake happens once instead of once per query.
+    """
     agent = Agent()
 
-    while True:
-        user_query = input("\nEnter your query (type 'exit' to stop): ")
+    try:
+        while True:
+            user_query = await anyio.to_thread.run_sync(
+                input, "\nEnter your query (type 'exit' to stop): "
+            )
+
+            if user_query.lower() == "exit":
+                print("Server stopped.")
+                break
 
-        if user_query.lower() == "exit":
-            print("Server stopped.")
-            break
+            print("\n--- Sending query to Agent ---")
 
-        print("\n--- Sending query to Agent ---")
+            response = await run_query(agent, user_query)
 
-        # MCP stdio_client requires anyio event loop (spawns process, task groups)
-        response = anyio.run(run_query, user_query, backend="asyncio")
+            print("\n--- Final Response Stored in Variable 'response' ---")
+            print(response)
+    finally:
+        aclose = getattr(agent, "aclose", None)
+        if aclose is not None:
+            await aclose()
+
+
+def main():
+    print("===== CM AI SERVER STARTED =====")
 
-        print("\n--- Final Response Stored in Variable 'response' ---")
-        print(response)
+    # MCP stdio_client requires anyio event loop (spawns process, task groups)
+    anyio.run(serve, backend="asyncio")
 
 
 if __name__ == "__main__":
@@ -24,21 +24,17 @@ The tools return system prompts and context; the client does the reasoning.
 - In-process: use inprocess_mcp_streams() so the agent talks to this server
   over in-memory streams (avoids Windows subprocess "Connection closed" issues).
 """
+import os
+import inspect
 from contextlib import asynccontextmanager
-from typing import AsyncIterator, List, Optional
+from typing import Any, AsyncIterator, Dict, List, Optional
 
 import anyio
 
 from mcp.server.fastmcp import FastMCP
 
-from tools.search import search_records_impl
-from tools.create import create_record_impl
-from tools.update import update_record_impl
-from tools.intent_detection import get_intent_prompt_impl
-from tools.ActionPlanGenerator import generate_action_plan_impl
-from tools.authentication import authenticate_user_impl
-from tools.email_validator import validate_email_impl
-from tools.authorization import check_authorization_impl
+# Workflow tool impls are imported inside each tool so startup doesn't pay
+# for the RAG, HTTP and OAuth modules before a client needs them.
 
 # Session-based tools
 from tools.session_tools import (
@@ -51,59 +47,81 @@ from tools.session_tools import (
     validate_token_impl,
     create_session_from_token_impl
 )
-
-mcp = FastMCP(
-    name="CM Tools",
-    instructions=(
-        "Content Manager MCP Server for search, create, and update operations.\n\n"
-        "IMPORTANT: There are TWO different workflows depending on whether this is the FIRST query or a SUBSEQUENT query in the chat.\n\n"
-        "=== FIRST QUERY IN CHAT (User has not authenticated yet) ===\n"
-        "1. FIRST: Call 'authenticate_user' tool (NO PARAMETERS NEEDED).\n"
-        "   - This opens the browser for Okta login.\n"
-        "   - Returns: email, name, session_id, and token.\n"
-        "   - IMPORTANT: Save the 'session_id' - you need it for ALL subsequent tool calls.\n"
-        "   - If authentication fails, STOP - do not proceed.\n\n"
-        "2. SECOND: Call 'validate_email' tool with the email from step 1.\n"
-        "   - Verifies the email exists in Content Manager.\n"
-        "   - If user doesn't exist, STOP - do not proceed.\n\n"
-        "3. THIRD: Call 'detect_intent' tool with the user's query.\n"
-        "   - Use the prompt to classify intent as: CREATE, UPDATE, SEARCH, or HELP.\n\n"
-        "4. FOURTH: Call 'check_authorization' tool with email and intent.\n"
-        "   - Verifies if the user is authorized for the intent.\n"
-        "   - If not authorized, STOP - do not proceed.\n\n"
-        "5. FIFTH: Call 'generate_action_plan' tool with user_query and intent.\n"
-        "   - Returns action plan structure for the operation.\n\n"
-        "6. SIXTH: Call the appropriate execution tool with action_plan:\n"
-        "   - operation='SEARCH' -> call 'search_records'\n"
-        "   - operation='CREATE' -> call 'create_record'\n"
-        "   - operation='UPDATE' -> call 'update_record'\n"
-        "   - NOTE: Session was already validated in step 1 (authenticate_user).\n\n"
-
-
-        "=== SUBSEQUENT QUERIES IN SAME CHAT (User already authenticated) ===\n"
-        "1. FIRST: Call 'validateSession' tool with the session_id from authentication.\n"
-        "   - Validates the session is still active (STRICT validation).\n"
-        "   - If session expired/invalid, call 'authenticate_user' again.\n"
-        "   - If session valid, proceed to detect_intent.\n\n"
-        "2. SECOND: Call 'detect_intent' tool with user's query.\n\n"
-        "3. THIRD: Call 'check_authorization' tool with email, intent.\n\n"
-        "4. FOURTH: Call 'generate_action_plan' tool with user_query, intent.\n\n"
-        "5. FIFTH: Call the appropriate execution tool with action_plan.\n"
-        "   - operation='SEARCH' -> call 'search_records'\n"
-        "   - operation='CREATE' -> call 'create_record'\n"
-        "   - operation='UPDATE' -> call 'update_record'\n"
-        "SESSION-BASED SECURITY:\n"
-        "- After authentication, you receive a 'session_id' - STORE THIS for the entire chat.\n"
-        "- For FIRST query: Session is created by 'authenticate_user'.\n"
-        "- For SUBSEQUENT queries: Call 'validateSession' FIRST to check session validity.\n"
-        "- The session_id is used to validate the user and retrieve their context.\n"
-        "- If session expires (1 minute) or becomes invalid, re-authenticate.\n"
-        "- Session stores: user info, conversation history, and workflow state.\n\n"
-        "NEVER skip steps. Always call 'validateSession' before 'detect_intent' for subsequent queries.\n"
-    )
+from auth import session_store
+from auth.auth_middleware import close_http_async
+
+# Message slots per direction for the in-process transport (0 = rendezvous)
+INPROC_STREAM_BUFFER = int(os.getenv("MCP_INPROC_BUF", "64"))
+
+# Server instructions sent to the client in the initialize response
+_INSTRUCTIONS = (
+    "Content Manager MCP Server for search, create, and update operations.\n\n"
+    "IMPORTANT: There are TWO different workflows depending on whether this is the FIRST query or a SUBSEQUENT query in the chat.\n\n"
+    "=== FIRST QUERY IN CHAT (User has not authenticated yet) ===\n"
+    "1. FIRST: Call 'authenticate_user' tool (NO PARAMETERS NEEDED).\n"
+    "   - This opens the browser for Okta login.\n"
+    "   - Returns: email, name, session_id, and token.\n"
+    "   - IMPORTANT: Save the 'session_id' - you need it for ALL subsequent tool calls.\n"
+    "   - If authentication fails, STOP - do not proceed.\n\n"
+    "2. SECOND: Call 'validate_email' tool with the email from step 1.\n"
+    "   - Verifies the email exists in Content Manager.\n"
+    "   - If user doesn't exist, STOP - do not proceed.\n\n"
+    "3. THIRD: Call 'detect_intent' tool with the user's query.\n"
+    "   - Use the prompt to classify intent as: CREATE, UPDATE, SEARCH, or HELP.\n\n"
+    "4. FOURTH: Call 'check_authorization' tool with email and intent.\n"
+    "   - Verifies if the user is authorized for the intent.\n"
+    "   - If not authorized, STOP - do not proceed.\n\n"
+    "5. FIFTH: Call 'generate_action_plan' tool with user_query and intent.\n"
+    "   - Returns action plan structure for the operation.\n\n"
+    "6. SIXTH: Call the appropriate execution tool with action_plan:\n"
+    "   - operation='SEARCH' -> call 'search_records'\n"
+    "   - operation='CREATE' -> call 'create_record'\n"
+    "   - operation='UPDATE' -> call 'update_record'\n"
+    "   - NOTE: Session was already validated in step 1 (authenticate_user).\n\n"
+
+
+    "=== SUBSEQUENT QUERIES IN SAME CHAT (User already authenticated) ===\n"
+    "1. FIRST: Call 'validateSession' tool with the session_id from authentication.\n"
+    "   - Validates the session is still active (STRICT validation).\n"
+    "   - If session expired/invalid, call 'authenticate_user' again.\n"
+    "   - If session valid, proceed to detect_intent.\n\n"
+    "2. SECOND: Call 'detect_intent' tool with user's query.\n\n"
+    "3. THIRD: Call 'check_authorization' tool with email, intent.\n\n"
+    "4. FOURTH: Call 'generate_action_plan' tool with user_query, intent.\n\n"
+    "5. FIFTH: Call the appropriate execution tool with action_plan.\n"
+    "   - operation='SEARCH' -> call 'search_records'\n"
+    "   - operation='CREATE' -> call 'create_record'\n"
+    "   - operation='UPDATE' -> call 'update_record'\n"
+    "SESSION-BASED SECURITY:\n"
+    "- After authentication, you receive a 'session_id' - STORE THIS for the entire chat.\n"
+    "- For FIRST query: Session is created by 'authenticate_user'.\n"
+    "- For SUBSEQUENT queries: Call 'validateSession' FIRST to check session validity.\n"
+    "- The session_id is used to validate the user and retrieve their context.\n"
+    "- If session expires (1 minute) or becomes invalid, re-authenticate.\n"
+    "- Session stores: user info, conversation history, and workflow state.\n\n"
+    "NEVER skip steps. Always call 'validateSession' before 'detect_intent' for subsequent queries.\n"
 )
 
 
+@asynccontextmanager
+async def _lifespan(server: FastMCP) -> AsyncIterator[None]:
+    """
+    Clean up when the server stops: persist session writes still waiting on
+    the debounce and close the JWKS HTTP client.
+    """
+    try:
+        yield
+    finally:
+        # Only flush a store that exists; creating one now would load every session for nothing
+        store = session_store._session_store
+        if store is not None:
+            await store.flush()
+        await close_http_async()
+
+
+mcp = FastMCP(name="CM Tools", instructions=_INSTRUCTIONS, lifespan=_lifespan)
+
+
 @mcp.tool()
 async def authenticate_user() -> dict:
     """
@@ -135,6 +153,7 @@ async def authenticate_user() -> dict:
     NOTE: Only call this for the FIRST query in a chat.
           For subsequent queries, use 'validateSession' to check session validity.
     """
+    from tools.authentication import authenticate_user_impl
     return await authenticate_user_impl()
 
 
@@ -196,6 +215,7 @@ async def validate_email(email: str) -> dict:
     NEXT STEP: If valid=True, call 'detect_intent' tool with the user's query.
                If valid=False, STOP - do not call any other tools.
     """
+    from tools.email_validator import validate_email_impl
     return await validate_email_impl(email)
 
 
@@ -221,6 +241,7 @@ async def detect_intent(user_query: str) -> dict:
     NEXT STEP: After detecting intent, call 'check_authorization' tool
                with the email and detected intent.
     """
+    from tools.intent_detection import get_intent_prompt_impl
     return await get_intent_prompt_impl(user_query)
 
 
@@ -256,6 +277,7 @@ async def check_authorization(email: str, intent: str) -> dict:
     NEXT STEP: If authorized=True, call 'generate_action_plan' tool with user_query and intent.
                If authorized=False, STOP - do not call any other tools.
     """
+    from tools.authorization import check_authorization_impl
     return await check_authorization_impl(email, intent)
 
 
@@ -287,6 +309,7 @@ async def generate_action_plan(
                - operation='UPDATE' -> call 'update_record' with action_plan
     
     """
+    from tools.ActionPlanGenerator import generate_action_plan_impl
     return await generate_action_plan_impl(user_query, intent)
 
 
@@ -321,6 +344,7 @@ async def search_records(
         
     WORKFLOW: validateSession -> detect_intent -> check_authorization -> generate_action_plan -> search_records (FINAL)
     """
+    from tools.search import search_records_impl
     return await search_records_impl(action_plan)
 
 
@@ -355,6 +379,7 @@ async def create_record(
     IMPORTANT: RecordTitle and RecordRecordType are MANDATORY.
     WORKFLOW: validateSession -> detect_intent -> check_authorization -> generate_action_plan -> create_record (FINAL)
     """
+    from tools.create import create_record_impl
     return await create_record_impl(action_plan)
 
 
@@ -396,6 +421,7 @@ async def update_record(
         
     WORKFLOW: validateSession -> detect_intent -> check_authorization -> generate_action_plan -> update_record (FINAL)
     """
+    from tools.update import update_record_impl
     return await update_record_impl(action_plan)
 
 
@@ -614,6 +640,114 @@ async def createSessionFromToken(bearer_token: str) -> dict:
     return await create_session_from_token_impl(bearer_token)
 
 
+# =============================================================================
+# BATCH EXECUTION
+# =============================================================================
+
+# Workflow tools that can be combined in a single batch_execute call
+_BATCHABLE_TOOLS = {
+    "authenticate_user": authenticate_user,
+    "validate_email": validate_email,
+    "detect_intent": detect_intent,
+    "check_authorization": check_authorization,
+    "generate_action_plan": generate_action_plan,
+    "search_records": search_records,
+    "create_record": create_record,
+    "update_record": update_record,
+}
+
+
+def _resolve_refs(arguments: Dict[str, Any], results: List[dict]) -> Dict[str, Any]:
+    """
+    Replace {"$ref": "<index>.<key>"} argument values with earlier results.
+
+    Raises:
+        ValueError: If the reference is malformed or points at a missing value.
+    """
+    resolved = {}
+    for name, value in arguments.items():
+        if isinstance(value, dict) and "$ref" in value:
+            index, _, key = str(value["$ref"]).partition(".")
+            try:
+                value = results[int(index)][key]
+            except (ValueError, IndexError, KeyError, TypeError):
+                raise ValueError(f"Unresolvable $ref '{value['$ref']}' for argument '{name}'")
+        resolved[name] = value
+    return resolved
+
+
+@mcp.tool()
+async def batch_execute(calls: List[dict]) -> dict:
+    """
+    Execute several workflow tools in one request, in order.
+    
+    Saves one MCP round-trip per folded call (e.g. authenticate_user +
+    validate_email on the first query). A later call can use an earlier
+    result as an argument with {"$ref": "<index>.<key>"}.
+    
+    Args:
+        calls: List of {"name": "<tool>", "arguments": {...}} entries.
+               Supported tools: authenticate_user, validate_email, detect_intent,
+               check_authorization, generate_action_plan, search_records,
+               create_record, update_record.
+               Example:
+               [
+                   {"name": "authenticate_user", "arguments": {}},
+                   {"name": "validate_email", "arguments": {"email": {"$ref": "0.email"}}}
+               ]
+        
+    Returns:
+        dict containing:
+        - results: One result dict per call, in the same order. A call that
+          fails gets {"error": ..., "tool": name}; later calls still run.
+    """
+    results: List[dict] = []
+    
+    for call in calls:
+        name = call.get("name")
+        impl = _BATCHABLE_TOOLS.get(name)
+        
+        if impl is None:
+            results.append({
+                "error": f"Tool not available in batch_execute: {name}",
+                "supported_tools": list(_BATCHABLE_TOOLS)
+            })
+            continue
+        
+        try:
+            arguments = _resolve_refs(call.get("arguments") or {}, results)
+        except ValueError as e:
+            results.append({"error": str(e), "tool": name})
+            continue
+        
+        try:
+            inspect.signature(impl).bind(**arguments)
+        except TypeError as e:
+            results.append({"error": f"Invalid arguments for {name}: {e}", "tool": name})
+            continue
+        
+        # A failing call gets an error entry; earlier results (e.g. session_id) are kept
+        try:
+            results.append(await impl(**arguments))
+        except Exception as e:
+            results.append({"error": f"{name} failed: {e}", "tool": name})
+    
+    return {"results": results}
+
+
+_init_options = None
+
+
+def _get_initialization_options():
+    """Build the server's initialization options once; tools are fixed at import."""
+    global _init_options
+    
+    if _init_options is None:
+        _init_options = mcp._mcp_server.create_initialization_options()
+    
+    return _init_options
+
+
 @asynccontextmanager
 async def inprocess_mcp_streams() -> AsyncIterator[tuple]:
     """
@@ -623,10 +757,11 @@ async def inprocess_mcp_streams() -> AsyncIterator[tuple]:
     """
     # Client writes -> a_send; server reads <- a_receive
     # Server writes -> b_send; client reads <- b_receive
-    a_send, a_receive = anyio.create_memory_object_stream(0)
-    b_send, b_receive = anyio.create_memory_object_stream(0)
+    # Buffered so back-to-back frames don't each wait for the peer to receive
+    a_send, a_receive = anyio.create_memory_object_stream(INPROC_STREAM_BUFFER)
+    b_send, b_receive = anyio.create_memory_object_stream(INPROC_STREAM_BUFFER)
 
-    init_options = mcp._mcp_server.create_initialization_options()
+    init_options = _get_initialization_options()
 
     async def run_server() -> None:
         try:
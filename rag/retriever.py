@@ -1,5 +1,6 @@
+import threading
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import ClassVar, List, Dict, Any, Optional
 
 from langchain_huggingface import HuggingFaceEmbeddings
 from langchain_community.vectorstores import FAISS
@@ -10,15 +11,30 @@ VECTORSTORE_DIR = BASE_DIR / "rag" / "vectorstore" / "tools"
 
 
 class ToolRetriever:
+    # Embedding model shared by all instances (loaded once per process)
+    _embeddings: ClassVar[Optional[HuggingFaceEmbeddings]] = None
+    _embeddings_lock: ClassVar[threading.Lock] = threading.Lock()
+
+    @classmethod
+    def _get_embeddings(cls) -> HuggingFaceEmbeddings:
+        """
+        Get the shared embedding model, loading it on first use.
+        """
+        if cls._embeddings is None:
+            with cls._embeddings_lock:
+                if cls._embeddings is None:
+                    cls._embeddings = HuggingFaceEmbeddings(
+                        model_name="sentence-transformers/all-MiniLM-L6-v2"
+                    )
+        return cls._embeddings
+
     def __init__(self):
         if not VECTORSTORE_DIR.exists():
             raise FileNotFoundError(
                 "Tool vectorstore not found. Run embedding_builder_tools.py first."
             )
 
-        self.embeddings = HuggingFaceEmbeddings(
-            model_name="sentence-transformers/all-MiniLM-L6-v2"
-        )
+        self.embeddings = self._get_embeddings()
 
         self.vectorstore = FAISS.load_local(
             str(VECTORSTORE_DIR),
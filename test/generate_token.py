@@ -35,12 +35,15 @@ data = {
     "redirect_uri": REDIRECT_URI
 }
  
-response = requests.post(token_url, headers=headers, data=data)
+with requests.Session() as session:
+    response = session.post(token_url, headers=headers, data=data, timeout=10)
  
 print("Status:", response.status_code)
+response.raise_for_status()
+body = response.json()
  
  
-print("Access Token:", response.json().get("access_token"))
+print("Access Token:", body.get("access_token"))
 print("-------------------------------------------")
  
-print("ID Token:",response.json().get("id_token"))
\ No newline at end of file
+print("ID Token:", body.get("id_token"))
@@ -0,0 +1,201 @@
+# Smoke check for the file, SQLite and Redis session stores: python test/session_store_smoke.py
+import os
+import sys
+import asyncio
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from auth.session_store import (
+    SessionStore,
+    SESSION_TIMEOUT_MINUTES,
+    MAX_CONVERSATION_MESSAGES,
+    CACHE_LAST_MESSAGES,
+    _iso_to_ts,
+)
+from auth.sqlite_session_store import SqliteSessionStore
+
+# ==============================
+# CONFIG
+# ==============================
+
+# Redis to test against; without one, fakeredis is used if installed
+REDIS_URL = os.getenv("REDIS_URL")
+
+# Wait out SESSION_TIMEOUT_MINUTES and check the session is really gone (slow)
+WAIT_FOR_EXPIRY = os.getenv("SMOKE_WAIT_FOR_EXPIRY") == "1"
+
+# ==============================
+
+
+def check(condition, message):
+    if not condition:
+        raise AssertionError(message)
+    print("  ok:", message)
+
+
+async def fill_conversation(store, session_id):
+    """Add more messages than the conversation keeps."""
+    total = MAX_CONVERSATION_MESSAGES + 5
+    for i in range(total):
+        role = "user" if i % 2 == 0 else "assistant"
+        await store.add_message(session_id, role, f"message {i}", tools_used=["search"])
+    return total
+
+
+async def check_conversation(store, session_id, total):
+    conversation = await store.get_conversation(session_id)
+    check(len(conversation) == MAX_CONVERSATION_MESSAGES,
+          f"conversation keeps the last {MAX_CONVERSATION_MESSAGES} messages")
+    check(conversation[0]["content"] == f"message {total - MAX_CONVERSATION_MESSAGES}",
+          "oldest messages were trimmed")
+    check(conversation[-1]["content"] == f"message {total - 1}", "newest message is last")
+
+    last_three = await store.get_conversation(session_id, limit=3)
+    check([m["content"] for m in last_three] == [f"message {i}" for i in range(total - 3, total)],
+          "limit returns the most recent messages")
+
+    cache = await store.get_cache(session_id)
+    last_messages = list(cache["last_messages"])
+    check(len(last_messages) == CACHE_LAST_MESSAGES,
+          f"cache mirrors the last {CACHE_LAST_MESSAGES} messages")
+    check(last_messages[-1]["content"] == f"message {total - 1}", "cache is up to date")
+
+
+def check_expiry(session):
+    lifetime = _iso_to_ts(session["expires_at"]) - _iso_to_ts(session["created_at"])
+    check(abs(lifetime - SESSION_TIMEOUT_MINUTES * 60) < 1,
+          f"session expires {SESSION_TIMEOUT_MINUTES} minute(s) after creation")
+
+
+async def smoke_local(name, make_store):
+    """Create, write, flush and reload a file or SQLite backed store."""
+    print(f"[{name}]")
+
+    store = make_store()
+    session = await store.create_session("smoke-user", "smoke-token", email="smoke@example.com", name="Smoke")
+    session_id = session["session_id"]
+
+    total = await fill_conversation(store, session_id)
+    await store.update_user_preferences(session_id, {"theme": "dark"})
+    await store.update_state(session_id, {"step": "search"})
+    await store.update_last_activity(session_id)
+    last_activity = session["last_activity"]
+    await store.flush()
+
+    reloaded = make_store()
+    session = await reloaded.get_session(session_id)
+    check(session is not None, "session survives a reload")
+    check("bearer_token" not in session, "bearer token was not persisted")
+    check(session["last_activity"] == last_activity, "last activity survives a reload")
+    check(await reloaded.get_session_by_user_id("smoke-user") is session, "user index is rebuilt")
+    check_expiry(session)
+
+    await check_conversation(reloaded, session_id, total)
+    cache = await reloaded.get_cache(session_id)
+    check(cache["user_preferences"] == {"theme": "dark"}, "preferences survive a reload")
+    check(await reloaded.get_state(session_id) == {"step": "search"}, "state survives a reload")
+    check(await reloaded.cleanup_expired_sessions() == [], "an unexpired session is not cleaned up")
+
+    if WAIT_FOR_EXPIRY:
+        await asyncio.sleep(SESSION_TIMEOUT_MINUTES * 60 + 1)
+        check(await reloaded.cleanup_expired_sessions() == [session_id], "expired session is cleaned up")
+        await reloaded.flush()
+        final = make_store()
+        check(await final.get_session(session_id) is None, "expired session stays deleted")
+    else:
+        await reloaded.invalidate_session(session_id)
+        await reloaded.flush()
+        final = make_store()
+        check(await final.get_session(session_id) is None, "invalidated session stays deleted")
+
+    return [store, reloaded, final]
+
+
+def make_redis_store():
+    from auth.redis_session_store import RedisSessionStore
+
+    if REDIS_URL:
+        return RedisSessionStore(REDIS_URL)
+
+    try:
+        import fakeredis.aioredis
+    except ImportError:
+        return None
+
+    store = RedisSessionStore("redis://fakeredis")
+    store._redis = fakeredis.aioredis.FakeRedis(decode_responses=True)
+    return store
+
+
+async def smoke_redis():
+    """Exercise the Redis store, including the WATCH/MULTI field updates."""
+    print("[redis]")
+
+    store = make_redis_store()
+    if store is None:
+        print("  skipped: set REDIS_URL or install fakeredis")
+        return
+
+    session = await store.create_session("smoke-user", "smoke-token", email="smoke@example.com", name="Smoke")
+    session_id = session["session_id"]
+    session_key = store._session_key(session_id)
+    cache_key = store._cache_key(session_id)
+
+    stored = await store.get_session(session_id)
+    check("bearer_token" not in stored, "bearer token was not stored")
+    check_expiry(stored)
+
+    total = await fill_conversation(store, session_id)
+    await store.flush()
+    await check_conversation(store, session_id, total)
+
+    # Concurrent updates of different fields all land (single HSETs / WATCH retries)
+    await asyncio.gather(
+        store.update_session_status(session_id, "idle"),
+        store.update_last_activity(session_id),
+        store.update_state(session_id, {"step": "search"}),
+        *(store.update_user_preferences(session_id, {f"pref{i}": i}) for i in range(10))
+    )
+    stored = await store.get_session(session_id)
+    check(stored["status"] == "idle", "status update landed")
+    cache = await store.get_cache(session_id)
+    check(cache["user_preferences"] == {f"pref{i}": i for i in range(10)},
+          "concurrent preference merges were all kept")
+    check(await store.get_state(session_id) == {"step": "search"}, "state update landed")
+
+    for key in (session_key, cache_key, store._conversation_key(session_id)):
+        ttl = await store._redis.ttl(key)
+        check(0 < ttl <= SESSION_TIMEOUT_MINUTES * 60, f"{key.split(':')[0]} key kept its TTL ({ttl}s)")
+
+    # After invalidation, a racing update must not recreate the key without a TTL
+    check(await store.invalidate_session(session_id), "session invalidated")
+    results = await asyncio.gather(
+        store.update_session_status(session_id, "active"),
+        store.update_last_activity(session_id),
+        store.update_cache(session_id, {"x": 1}),
+        store.update_user_preferences(session_id, {"late": True})
+    )
+    check(results == [False, False, False, False], "updates of a deleted session report not found")
+    check(not await store._redis.exists(session_key, cache_key), "deleted keys were not recreated")
+    check(await store.add_message(session_id, "user", "late") is None, "messages for a deleted session are dropped")
+
+    if WAIT_FOR_EXPIRY:
+        session = await store.create_session("smoke-user", "smoke-token")
+        await asyncio.sleep(SESSION_TIMEOUT_MINUTES * 60 + 1)
+        check(await store.get_session(session["session_id"]) is None, "session expired through its TTL")
+        check(await store.update_last_activity(session["session_id"]) is False,
+              "an expired session is not recreated")
+
+
+async def main():
+    # Keep the stores alive until the loop ends; their idle flusher tasks go with them
+    stores = []
+    with tempfile.TemporaryDirectory() as storage_dir:
+        stores += await smoke_local("file", lambda: SessionStore(os.path.join(storage_dir, "files")))
+        stores += await smoke_local("sqlite", lambda: SqliteSessionStore(os.path.join(storage_dir, "sqlite")))
+    await smoke_redis()
+    print("All session store smoke checks passed")
+
+
+asyncio.run(main())
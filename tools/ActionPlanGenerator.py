@@ -17,11 +17,61 @@ NEXT STEP: After generating the action plan, call the appropriate tool (STEP 6)
 """
 
 import os
+from functools import lru_cache
 from rag.retriever import ToolRetriever
 
 # Path to the tool selection prompt file
 TOOL_SELECTION_PROMPT_PATH = os.path.join(os.path.dirname(__file__), "..", "prompts", "tool_selection_prompt.md")
 
+# Prompt text, read from disk on first use (the file doesn't change at runtime)
+_tool_selection_prompt = None
+
+# Shared retriever instance (embedding model + FAISS index are loaded once)
+_tool_retriever = None
+
+
+def _get_tool_retriever() -> ToolRetriever:
+    """
+    Get or create the ToolRetriever singleton.
+    
+    Returns:
+        The ToolRetriever instance.
+    """
+    global _tool_retriever
+    
+    if _tool_retriever is None:
+        _tool_retriever = ToolRetriever()
+    
+    return _tool_retriever
+
+
+@lru_cache(maxsize=512)
+def _retrieve_docs(user_query: str) -> str:
+    """
+    Get the RAG matches for a query, memoized per query text.
+    
+    Retrieval only depends on the query, so repeated queries skip the
+    embedding and similarity search. Failures are not cached. Call
+    _retrieve_docs.cache_clear() after rebuilding the tool index.
+    """
+    return str(_get_tool_retriever().match(user_query))
+
+
+def _load_tool_selection_prompt() -> str:
+    """
+    Get the tool selection prompt, reading the file only once.
+    
+    Raises:
+        FileNotFoundError: If the prompt file is missing.
+    """
+    global _tool_selection_prompt
+    
+    if _tool_selection_prompt is None:
+        with open(TOOL_SELECTION_PROMPT_PATH, "r", encoding="utf-8") as f:
+            _tool_selection_prompt = f.read()
+    
+    return _tool_selection_prompt
+
 
 async def generate_action_plan_impl(
     user_query: str,
@@ -51,8 +101,7 @@ async def generate_action_plan_impl(
     print(f"[ACTION_PLAN] Generating action plan for intent: {intent}")
     
     try:
-        with open(TOOL_SELECTION_PROMPT_PATH, "r", encoding="utf-8") as f:
-            system_prompt = f.read()
+        system_prompt = _load_tool_selection_prompt()
     except FileNotFoundError:
         return {
             "error": "Tool selection prompt file not found",
@@ -61,7 +110,7 @@ async def generate_action_plan_impl(
     
     # Get relevant documentation using RAG
     try:
-        retrieved_docs = ToolRetriever().match(user_query)
+        retrieved_docs = _retrieve_docs(user_query)
     except Exception as e:
         retrieved_docs = f"(RAG retrieval failed: {str(e)})"
     
@@ -69,7 +118,7 @@ async def generate_action_plan_impl(
         "system_prompt": system_prompt,
         "user_query": user_query,
         "intent": intent,
-        "retrieved_docs": str(retrieved_docs),
+        "retrieved_docs": retrieved_docs,
         "instruction": (
             "Use the system_prompt to generate a valid JSON action plan based on the user_query and intent. "
             "Follow the exact JSON structure specified in the prompt for the given intent (SEARCH, CREATE, or UPDATE). "
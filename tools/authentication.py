@@ -24,6 +24,7 @@ import os
 # Import session store for session creation
 from auth.session_store import get_session_store
 from auth.auth_middleware import encrypt_token
+from tools.authorization import clear_authorization_cache
 
 # ==============================
 # OKTA CONFIGURATION (Hardcoded)
@@ -304,6 +305,9 @@ async def authenticate_user_impl() -> dict:
         
         print(f"[AUTH] Session created: {session['session_id']}")
         
+        # Re-authentication refreshes the user's cached authorization
+        clear_authorization_cache(email)
+        
         return {
             "authenticated": True,
             "email": email,
@@ -12,20 +12,134 @@ NEXT STEP: If authorized, call 'generate_action_plan' tool (step 5).
            If NOT authorized, STOP - do not call any other tools.
 """
 
+import os
+import time
+import asyncio
+from collections import OrderedDict
+from typing import Optional, Tuple
+
 import requests
 
+from tools.http_session import get_http_session
+
 # Content Manager API endpoint
 CM_API_BASE = "http://10.194.93.112/CMServiceAPI"
 
+# User type cache: email -> (fetched_at, user_type)
+# Set AUTHZ_CACHE_TTL_SECONDS=0 for strict mode (look up the user type on every check).
+AUTHZ_CACHE_TTL_SECONDS = int(os.getenv("AUTHZ_CACHE_TTL_SECONDS", "300"))
+AUTHZ_CACHE_MAX_ENTRIES = int(os.getenv("AUTHZ_CACHE_MAX_ENTRIES", "1024"))
+# Kept in fetch order, so the entries that expire first are at the front
+_user_type_cache: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+
 # Authorization mapping: user type -> allowed operations
+# (tuples, so responses can share them instead of copying a list per call)
 AUTHORIZATION_MAP = {
-    "Inquiry User": ["SEARCH"],
-    "Administrator": ["SEARCH", "CREATE", "UPDATE"],
-    "Records Manager": ["SEARCH", "CREATE", "UPDATE"],
-    "Records Co-ordinator": ["SEARCH", "CREATE", "UPDATE"],
-    "Knowledge Worker": ["SEARCH", "CREATE", "UPDATE"],
-    "Contributor": ["SEARCH", "CREATE"],
+    "Inquiry User": ("SEARCH",),
+    "Administrator": ("SEARCH", "CREATE", "UPDATE"),
+    "Records Manager": ("SEARCH", "CREATE", "UPDATE"),
+    "Records Co-ordinator": ("SEARCH", "CREATE", "UPDATE"),
+    "Knowledge Worker": ("SEARCH", "CREATE", "UPDATE"),
+    "Contributor": ("SEARCH", "CREATE"),
+}
+
+# Constant parts of the responses; copied and filled in per check
+_AUTHORIZED_RESPONSE = {
+    "authorized": True,
+    "instruction": "User is authorized. Proceed with the operation.",
+    "next_step": "Call 'generate_action_plan' tool with the user_query and intent."
 }
+_HELP_RESPONSE = {
+    **_AUTHORIZED_RESPONSE,
+    "intent": "HELP",
+    "message": "User is authorized to request HELP",
+    "instruction": "User is authorized. Proceed with the help request."
+}
+_DENIED_INSTRUCTIONS = {
+    user_type: f"STOP - This user can only perform: {', '.join(operations)}. Do not call any other tools."
+    for user_type, operations in AUTHORIZATION_MAP.items()
+}
+_NO_OPERATIONS_INSTRUCTION = "STOP - This user can only perform: no operations. Do not call any other tools."
+
+
+def _fetch_user_type(email: str) -> Optional[str]:
+    """
+    Look up the user's type in Content Manager.
+    
+    Args:
+        email: The user's email address.
+        
+    Returns:
+        The user type string, or None if no user exists with this email.
+        
+    Raises:
+        requests.exceptions.HTTPError: If the Content Manager API call fails.
+    """
+    url = f"{CM_API_BASE}/Location"
+    
+    params = {
+        "q": f"email={email}",
+        "format": "json",
+        "properties": "userType"
+    }
+    
+    headers = {
+        "User-Agent": "Mozilla/5.0",
+        "Accept": "application/json"
+    }
+    
+    response = get_http_session().get(url, params=params, headers=headers)
+    print(f"[AUTHORIZATION] Response status: {response.status_code}")
+    
+    response.raise_for_status()
+    data = response.json()
+    
+    results = data.get("Results", [])
+    
+    if not results or len(results) == 0:
+        return None
+    
+    # Extract user type from response
+    user_info = results[0]
+    location_user_type = user_info.get("LocationUserType", {})
+    
+    # Get the StringValue (human-readable user type)
+    return location_user_type.get("StringValue", "Unknown")
+
+
+def _cache_user_type(email: str, user_type: str) -> None:
+    """
+    Cache a freshly fetched user type.
+    
+    Expired entries are dropped on insert, and the oldest entries are evicted
+    once the cache holds more than AUTHZ_CACHE_MAX_ENTRIES users.
+    
+    Args:
+        email: The user's email address.
+        user_type: The user type returned by Content Manager.
+    """
+    now = time.time()
+    _user_type_cache[email] = (now, user_type)
+    _user_type_cache.move_to_end(email)
+    
+    while _user_type_cache:
+        fetched_at, _ = next(iter(_user_type_cache.values()))
+        if now - fetched_at < AUTHZ_CACHE_TTL_SECONDS and len(_user_type_cache) <= AUTHZ_CACHE_MAX_ENTRIES:
+            break
+        _user_type_cache.popitem(last=False)
+
+
+def clear_authorization_cache(email: str = None) -> None:
+    """
+    Drop cached user types, e.g. after the user re-authenticates.
+    
+    Args:
+        email: Only drop this user's entry. Clears everything if omitted.
+    """
+    if email is None:
+        _user_type_cache.clear()
+    else:
+        _user_type_cache.pop(email, None)
 
 
 async def check_authorization_impl(email: str, intent: str) -> dict:
@@ -64,44 +178,26 @@ async def check_authorization_impl(email: str, intent: str) -> dict:
     NEXT STEP: If authorized=True, call 'generate_action_plan' tool.
                If authorized=False, STOP - do not proceed with any other tools.
     """
-    url = f"{CM_API_BASE}/Location"
-    
-    params = {
-        "q": f"email={email}",
-        "format": "json",
-        "properties": "userType"
-    }
-    
-    headers = {
-        "User-Agent": "Mozilla/5.0",
-        "Accept": "application/json"
-    }
-    
     print(f"\n[AUTHORIZATION] Checking user type for: {email}")
     print(f"[AUTHORIZATION] Intent to authorize: {intent}")
     
     try:
-        response = requests.get(url, params=params, headers=headers)
-        print(f"[AUTHORIZATION] Response status: {response.status_code}")
-        
-        response.raise_for_status()
-        data = response.json()
-        
-        results = data.get("Results", [])
-        
-        if not results or len(results) == 0:
-            return {
-                "authorized": False,
-                "error": f"User not found with email: {email}",
-                "instruction": "STOP - Cannot verify user type. Do not call any other tools."
-            }
-        
-        # Extract user type from response
-        user_info = results[0]
-        location_user_type = user_info.get("LocationUserType", {})
+        cached = _user_type_cache.get(email) if AUTHZ_CACHE_TTL_SECONDS > 0 else None
         
-        # Get the StringValue (human-readable user type)
-        user_type = location_user_type.get("StringValue", "Unknown")
+        if cached and time.time() - cached[0] < AUTHZ_CACHE_TTL_SECONDS:
+            user_type = cached[1]
+        else:
+            user_type = await asyncio.to_thread(_fetch_user_type, email)
+            
+            if user_type is None:
+                return {
+                    "authorized": False,
+                    "error": f"User not found with email: {email}",
+                    "instruction": "STOP - Cannot verify user type. Do not call any other tools."
+                }
+            
+            if AUTHZ_CACHE_TTL_SECONDS > 0:
+                _cache_user_type(email, user_type)
         
         print(f"[AUTHORIZATION] User type: {user_type}")
         
@@ -110,31 +206,23 @@ async def check_authorization_impl(email: str, intent: str) -> dict:
         
         # Handle HELP intent - allow all users to ask for help
         if intent_upper == "HELP":
-            return {
-                "authorized": True,
-                "user_type": user_type,
-                "intent": intent_upper,
-                "message": f"User is authorized to request HELP",
-                "instruction": "User is authorized. Proceed with the help request.",
-                "next_step": "Call 'generate_action_plan' tool with the user_query and intent."
-            }
+            response = _HELP_RESPONSE.copy()
+            response["user_type"] = user_type
+            return response
         
         # Get allowed operations for this user type
-        allowed_operations = AUTHORIZATION_MAP.get(user_type, [])
+        allowed_operations = AUTHORIZATION_MAP.get(user_type, ())
         
         print(f"[AUTHORIZATION] Allowed operations for {user_type}: {allowed_operations}")
         
         # Check if intent is in allowed operations
         if intent_upper in allowed_operations:
             print(f"[AUTHORIZATION] SUCCESS: User authorized for {intent_upper}")
-            return {
-                "authorized": True,
-                "user_type": user_type,
-                "intent": intent_upper,
-                "message": f"User is authorized to perform {intent_upper}",
-                "instruction": "User is authorized. Proceed with the operation.",
-                "next_step": "Call 'generate_action_plan' tool with the user_query and intent."
-            }
+            response = _AUTHORIZED_RESPONSE.copy()
+            response["user_type"] = user_type
+            response["intent"] = intent_upper
+            response["message"] = f"User is authorized to perform {intent_upper}"
+            return response
         else:
             print(f"[AUTHORIZATION] DENIED: User not authorized for {intent_upper}")
             return {
@@ -143,7 +231,7 @@ async def check_authorization_impl(email: str, intent: str) -> dict:
                 "intent": intent_upper,
                 "error": f"User with type '{user_type}' is not authorized to perform {intent_upper}",
                 "allowed_operations": allowed_operations,
-                "instruction": f"STOP - This user can only perform: {', '.join(allowed_operations) if allowed_operations else 'no operations'}. Do not call any other tools."
+                "instruction": _DENIED_INSTRUCTIONS.get(user_type, _NO_OPERATIONS_INSTRUCTION)
             }
             
     except requests.exceptions.HTTPError as e:
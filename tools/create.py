@@ -28,7 +28,9 @@ WORKFLOW POSITION: This is typically the FINAL tool in a CREATE workflow.
 NOTE: RecordTitle and RecordRecordType are MANDATORY fields for record creation.
 """
 
-import requests
+import asyncio
+
+from tools.http_session import get_http_session
 
 # BASE_URL = "http://localhost/CMServiceAPI/Record/"
 BASE_URL = "http://10.194.93.112/CMServiceAPI/Record?q="
@@ -89,7 +91,7 @@ async def create_record_impl(
         }
     
     try:
-        response = requests.post(BASE_URL, json=parameters)
+        response = await asyncio.to_thread(get_http_session().post, BASE_URL, json=parameters)
         response.raise_for_status()
         try:
             result = response.json()
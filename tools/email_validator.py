@@ -8,8 +8,12 @@ NEXT STEP: If validation succeeds, proceed to 'detect_intent' tool.
            If validation fails, STOP - do not call any other tools.
 """
 
+import asyncio
+
 import requests
 
+from tools.http_session import get_http_session
+
 # Content Manager API endpoint
 # CM_API_BASE = "https://cmbeta.in/CMServiceAPI"
 CM_API_BASE = "http://10.194.93.112/CMServiceAPI"
@@ -64,7 +68,7 @@ async def validate_email_impl(email: str) -> dict:
     # if(len(response.get("Results")) == 0):
     #     return "No user found with this email"
     # return "User Found now call intent"
-    response = requests.get(url, params=params, headers=headers)
+    response = await asyncio.to_thread(get_http_session().get, url, params=params, headers=headers)
     try:
         response.raise_for_status()
         data = response.json()
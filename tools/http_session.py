@@ -0,0 +1,35 @@
+"""
+Shared HTTP session for Content Manager API calls.
+
+All tools go through one pooled requests.Session, so calls to the
+Content Manager API reuse keep-alive connections instead of opening a
+new TCP connection per request.
+
+The session is blocking; async tools should call it via asyncio.to_thread()
+so a slow API call doesn't stall the event loop.
+"""
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Shared session instance
+_http_session = None
+
+
+def get_http_session() -> requests.Session:
+    """
+    Get or create the shared HTTP session.
+    
+    Returns:
+        The requests.Session instance.
+    """
+    global _http_session
+    
+    if _http_session is None:
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        _http_session = session
+    
+    return _http_session
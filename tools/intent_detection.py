@@ -13,6 +13,25 @@ import os
 # Path to the intent prompt file
 INTENT_PROMPT_PATH = os.path.join(os.path.dirname(__file__), "..", "prompts", "intent_prompt.md")
 
+# Prompt text, read from disk on first use (the file doesn't change at runtime)
+_intent_prompt = None
+
+
+def _load_intent_prompt() -> str:
+    """
+    Get the intent prompt, reading the file only once.
+    
+    Raises:
+        FileNotFoundError: If the prompt file is missing.
+    """
+    global _intent_prompt
+    
+    if _intent_prompt is None:
+        with open(INTENT_PROMPT_PATH, "r", encoding="utf-8") as f:
+            _intent_prompt = f.read()
+    
+    return _intent_prompt
+
 
 async def get_intent_prompt_impl(user_query: str) -> dict:
     """
@@ -33,8 +52,7 @@ async def get_intent_prompt_impl(user_query: str) -> dict:
     """
     
     try:
-        with open(INTENT_PROMPT_PATH, "r", encoding="utf-8") as f:
-            system_prompt = f.read()
+        system_prompt = _load_intent_prompt()
     except FileNotFoundError:
         return {
             "error": "Intent prompt file not found",
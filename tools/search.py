@@ -28,9 +28,11 @@ WORKFLOW POSITION: This is typically the FINAL tool in a SEARCH workflow.
                    validateSession -> detect_intent -> generate_action_plan -> search_records
 """
 
-import requests
+import asyncio
 from urllib.parse import urlencode
 
+from tools.http_session import get_http_session
+
 # BASE_URL = "http://localhost/CMServiceAPI/Record?q="
 BASE_URL = "http://10.194.93.112/CMServiceAPI/Record?q="
 # BASE_URL = "https://cmbeta.in/CMServiceAPI/Record?q="
@@ -74,7 +76,7 @@ async def search_records_impl(
     url = f"{BASE_URL}{query}"
 
     try:
-        response = requests.get(url)
+        response = await asyncio.to_thread(get_http_session().get, url)
         response.raise_for_status()
         result = response.json()
         
@@ -19,6 +19,7 @@ Usage:
         ...
 """
 
+import time
 from typing import Optional
 from auth.session_store import get_session_store
 from auth.auth_middleware import validate_jwt, AuthMiddlewareError
@@ -115,13 +116,17 @@ async def validate_session_for_tool(
                 "instruction": f"Session is {status}. Call 'authenticate_user' to re-authenticate."
             }
     
-    # Check session expiry
+    # Check session expiry (epoch field when the store provides it)
     from datetime import datetime
+    expires_at_ts = session.get("expires_at_ts")
     expires_at_str = session.get("expires_at")
-    if expires_at_str:
+    if expires_at_ts is not None or expires_at_str:
         try:
-            expires_at = datetime.fromisoformat(expires_at_str.replace("Z", ""))
-            if expires_at < datetime.utcnow():
+            if expires_at_ts is not None:
+                expired = expires_at_ts < time.time()
+            else:
+                expired = datetime.fromisoformat(expires_at_str.replace("Z", "")) < datetime.utcnow()
+            if expired:
                 # Mark session as expired
                 await session_store.update_session_status(session.get("session_id"), "expired")
                 return {
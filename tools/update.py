@@ -38,9 +38,11 @@ NOTE: The tool first searches for the record using parameters_to_search,
       then updates it with parameters_to_update.
 """
 
-import requests
+import asyncio
 from urllib.parse import urlencode
 
+from tools.http_session import get_http_session
+
 # BASE URLs
 # SEARCH (GET)
 SEARCH_BASE_URL = "http://10.194.93.112/CMServiceAPI/Record?q="
@@ -102,7 +104,7 @@ async def update_record_impl(
     print(search_url)
 
     try:
-        search_response = requests.get(search_url)
+        search_response = await asyncio.to_thread(get_http_session().get, search_url)
         search_response.raise_for_status()
         search_data = search_response.json()
     except Exception as e:
@@ -159,7 +161,7 @@ async def update_record_impl(
     # STEP 4: POST (UPDATE)
     # ------------------------------------------------
     try:
-        update_response = requests.post(UPDATE_BASE_URL, json=update_body)
+        update_response = await asyncio.to_thread(get_http_session().post, UPDATE_BASE_URL, json=update_body)
         update_response.raise_for_status()
         result = update_response.json()
        